@@ -1,202 +1,270 @@
 import streamlit as st
+import os
 import random
 import time
+import uuid
 from datetime import datetime, timedelta
 
+from overdue_alerts import OverdueAlertEngine, JsonlFileSink, patient_deadline
+from patient_archive import PatientArchive
+from duration_model import DurationModel
+from replay import TraceRecorder
+from profiling import RerunProfiler, profiling_mode
+from session_store import SessionStore, new_session_data, make_shared_mock_patients
+from intake import IntakeFeed, WalkInQueue
+from triage_rules import RuleWatcher, current_rules
+from triage_core import (
+    validate_checkin, new_checkin_patient, enqueue_patient, sort_queue, apply_rules,
+    start_next_treatment, finish_patient, get_waiting_minutes, queue_wait_estimates
+)
+
 st.set_page_config(page_title="Emergency Care Dashboard (Prototype)", layout="wide")
 
 # ---------------------
-# Utilities & Mock Data
+# Utilities
 # ---------------------
 
-FIRST_NAMES = ["Alex","Sam","Jordan","Taylor","Riley","Morgan","Casey","Jamie","Avery","Cameron",
-               "Lee","Robin","Neil","Ike","Noah","Maya","Zara","Lina","Ola","Ethan"]
-LAST_NAMES = ["Adams","Bell","Clark","Davis","Evans","Ford","Green","Hall","Irwin","James",
-              "Khan","Lopez","Miller","Nguyen","Osei","Patel","Quinn","Reed","Smith","Young"]
-
-# New data structures based on the provided triage logic
-CRITICAL_SYMPTOMS = {
-    "Severe chest pain": 1,
-    "Loss of consciousness": 1,
-    "Uncontrolled bleeding": 1,
-    "Severe allergic reaction (anaphylaxis)": 1,
-    "Poisoning/overdose": 1,
-    "Severe head injury": 1,
-    "Severe burns": 2,
-    "Seizure (active/recent)": 2,
-    "Severe pain crisis": 2
-}
-
-VULNERABLE_GROUPS_CONDITIONS = {
-    "Pregnant": True,
-    "Immune compromised": True,
-    "Organ transplant recipient": True,
-    "COPD": True,
-    "Cancer": True,
-    "Kidney disease": True,
-    "Liver disease": True,
-    "Blood disorders (Hemophilia, Sickle Cell, etc.)": True
-}
+def get_treatment_duration(patient):
+    """Get expected treatment duration, learned from completed treatments"""
+    return duration_model.predict(patient)
+
+def calculate_wait_times(queue_patients):
+    """Estimated wait for every position of the sorted queue, in one pass."""
+    # The queue is sorted by rank, so all patients ahead have higher or equal priority;
+    # each estimate is the running sum of their treatment times.
+    return queue_wait_estimates(queue_patients, get_treatment_duration)
+
+@st.cache_resource
+def get_alert_engine():
+    """Process-wide overdue alerting engine shared by every session"""
+    return OverdueAlertEngine(sink=JsonlFileSink("overdue_alerts.jsonl")).start()
+
+@st.cache_resource
+def get_patient_archive():
+    """Process-wide archive of completed encounters"""
+    return PatientArchive("patient_archive")
+
+@st.cache_resource
+def get_duration_model():
+    """Process-wide duration model, warmed from the completed-patient archive"""
+    model = DurationModel()
+    model.fit_frame(get_patient_archive().load(columns=["rank", "age", "symptom", "treatment_min"]))
+    return model
+
+@st.cache_resource
+def get_trace_recorder():
+    """Records check-in/treatment actions for replay.py when TRIAGE_TRACE is set"""
+    path = os.environ.get("TRIAGE_TRACE")
+    return TraceRecorder(path) if path else None
+
+def record_action(action, patient=None, scope=None, **fields):
+    if trace_recorder is not None:
+        if patient is not None:
+            fields["patient"] = f"{scope or st.session_state.alert_scope}-{patient['id']}"
+        trace_recorder.record(action, **fields)
+
+@st.cache_resource
+def get_rule_watcher():
+    """Hot-reloads triage_rules.json and re-ranks every session's queue when it changes"""
+    session_store = get_session_store()
+    walkin_queue = get_walkin_queue()
+    alert_engine = get_alert_engine()
+
+    def rerank_everywhere(previous, rules):
+        def rerank(scope, data):
+            for patient in apply_rules(data, rules):
+                alert_engine.track(patient, scope=scope)
+
+        # Idle sessions would otherwise keep stale ranks and timers until they rerun
+        session_store.update_all(rerank)
+        with walkin_queue.lock:
+            rerank(WALKIN_SCOPE, walkin_queue.state)
+
+    return RuleWatcher(on_swap=rerank_everywhere).start()
+
+# Alert and trace scope of the shared kiosk walk-in queue
+WALKIN_SCOPE = "walk-in"
+
+@st.cache_resource
+def get_walkin_queue():
+    """Kiosk check-ins from intake_log.jsonl, consumed once into one queue every session shares"""
+    alert_engine = get_alert_engine()
+    recorder = get_trace_recorder()
+
+    def arrived(patient):
+        alert_engine.track(patient, scope=WALKIN_SCOPE)
+        if recorder is not None:
+            recorder.record("arrive", patient=f"{WALKIN_SCOPE}-{patient['id']}", name=patient["name"],
+                            age=patient["age"], critical=patient["critical"],
+                            other_symptoms=patient["other_symptoms"], high_risk=patient["high_risk"],
+                            other_conditions=patient["other_conditions"])
+
+    # kiosk.py may run as a separate server; the log is the hand-off
+    return WalkInQueue(IntakeFeed("intake_log.jsonl"), on_arrival=arrived).start()
+
+def archive_evicted_session(scope, data):
+    """Archive an idle session's waiting and in-treatment patients before it is dropped"""
+    archive = get_patient_archive()
+    for patient in data.queue_patients + data.treatment_patients:
+        if not patient.get("is_sample"):
+            archive.record(patient, scope=scope, outcome="evicted")
+    get_alert_engine().cancel_scope(scope)
+
+@st.cache_resource
+def get_session_store():
+    """Process-wide store of per-session patient data; idle sessions are evicted"""
+    # TRIAGE_SEED makes the mock patients identical across runs
+    seed = os.environ.get("TRIAGE_SEED")
+    mock_rules = current_rules()
+    mock_patients = make_shared_mock_patients(random.Random(int(seed)) if seed else random, rules=mock_rules)
+    next_id_start = max(p["id"] for p in mock_patients) + 1
+    return SessionStore(
+        lambda: new_session_data(mock_patients, next_id_start, rules=mock_rules),
+        max_sessions=int(os.environ.get("TRIAGE_MAX_SESSIONS", 200)),
+        idle_seconds=int(os.environ.get("TRIAGE_SESSION_IDLE_SECONDS", 3600)),
+        on_evict=archive_evicted_session
+    )
 
-OTHER_SYMPTOMS = {
-    "Abdominal pain": 3,
-    "Mild breathing issues": 3,
-    "Dizziness": 3,
-    "Vomiting": 4,
-    "Nausea": 5,
-    "Diarrhea": 5,
-    "Back pain": 6,
-    "Fatigue": 6,
-    "Joint pain": 6,
-    "Minor cuts/bruises": 7
-}
+@st.cache_resource
+def get_rerun_profiler():
+    """Aggregates profiled reruns across sessions (see profiling.py)"""
+    return RerunProfiler()
+
+ANALYTICS_DAYS = 30
+
+@st.cache_data(ttl=60)
+def load_rank_analytics():
+    """Per-rank percentiles over the last ANALYTICS_DAYS of the archive, refreshed at most once a minute"""
+    start_day = (datetime.now() - timedelta(days=ANALYTICS_DAYS)).date().isoformat()
+    return get_patient_archive().rank_percentiles(start_day=start_day)
+
+def complete_patient(patient, source_list, queue_state, scope):
+    """Archive a finished encounter and drop it from its queue"""
+    # Sample patients have made-up times; they must not reach the archive
+    # (which warms the model on startup) or the duration model
+    if not patient.get("is_sample"):
+        patient_archive.record(patient, scope=scope)
+        if patient.get("treatment_start"):
+            treatment_mins = (datetime.now() - datetime.fromisoformat(patient["treatment_start"])).total_seconds() / 60
+            duration_model.observe(patient, treatment_mins)
+    finish_patient(queue_state, patient, source_list)
+    record_action("complete", patient, scope=scope)
+    alert_engine.cancel(patient["id"], scope=scope)
+
+def render_queue(queue_state, scope, key_prefix=""):
+    """Waiting queue, treatment list and next-patient controls for one queue"""
+    # Section 1: Waiting Queue
+    st.subheader("⏳ Waiting Queue")
+    if queue_state.queue_patients:
+        wait_estimates = calculate_wait_times(queue_state.queue_patients)
+        for i, patient in enumerate(queue_state.queue_patients):
+            waited_mins = get_waiting_minutes(patient["check_in"])
+            est_remaining = wait_estimates[i]
 
-OTHER_CONDITIONS = {
-    "Migraine": 6,
-    "High blood pressure (stable)": 7,
-    "Depression": 7,
-    "Anxiety": 7,
-    "Arthritis": 8,
-    "Allergies (non-severe)": 8,
-    "Thyroid disease": 8,
-    "Osteoporosis": 8,
-    "None (no medical issue, routine check)": 10
-}
+            # Same deadline the alert engine fires on: the rank's wait-time target
+            is_overdue = time.time() > patient_deadline(patient, rules)[1]
 
-WAIT_TIME_TARGETS = {
-    1: "Immediate (0–2 minutes)",
-    2: "Very urgent (≤5 minutes)",
-    3: "Urgent (≤15 minutes)",
-    4: "Semi-urgent (≤30 minutes)",
-    5: "Moderate (≤1 hour)",
-    6: "Mild (≤2 hours)",
-    7: "Stable (≤3 hours)",
-    8: "Non-urgent (≤4 hours)",
-    9: "Very low priority (walk-in timeframe)",
-    10: "Lowest (same-day or next-day acceptable)"
-}
+            col1, col2, col3, col4, col5, col6 = st.columns([2, 1.5, 1, 1.5, 1, 1])
 
-def calculate_triage_rank(patient):
-    """Calculates the triage rank based on the new logic."""
-    ranks = []
+            with col1:
+                if is_overdue:
+                    st.markdown(f"**🔴 {patient['name']}** (ID: {patient['id']})")
+                else:
+                    st.markdown(f"**{patient['name']}** (ID: {patient['id']})")
 
-    # Check critical symptoms
-    for symptom in patient.get("critical", []):
-        if symptom in CRITICAL_SYMPTOMS:
-            ranks.append(CRITICAL_SYMPTOMS[symptom])
+            with col2:
+                st.write(patient["priority"])
 
-    # Check other symptoms
-    for symptom in patient.get("other_symptoms", []):
-        if symptom in OTHER_SYMPTOMS:
-            ranks.append(OTHER_SYMPTOMS[symptom])
+            with col3:
+                if is_overdue:
+                    st.markdown(f"<span style='color: red; font-weight: bold;'>{waited_mins} mins</span>", unsafe_allow_html=True)
+                else:
+                    st.write(f"{waited_mins} mins")
 
-    # Check other conditions
-    for condition in patient.get("other_conditions", []):
-        if condition in OTHER_CONDITIONS:
-            ranks.append(OTHER_CONDITIONS[condition])
+            with col4:
+                st.write(f"{est_remaining} mins")
 
-    # The 'high_risk' key from the form now maps to vulnerable conditions
-    is_vulnerable_by_condition = any(c in VULNERABLE_GROUPS_CONDITIONS for c in patient.get("high_risk", []))
+            with col5:
+                if is_overdue:
+                    st.markdown("<span style='color: red; font-weight: bold;'>OVERDUE</span>", unsafe_allow_html=True)
+                else:
+                    st.write("Waiting")
 
-    if not ranks:
-        base_rank = 10  # Default for no selections
+            with col6:
+                col6a, col6b = st.columns(2)
+                with col6a:
+                    if st.button("✅", key=f"{key_prefix}complete_queue_{patient['id']}", help="Mark as Complete"):
+                        # Move to completed
+                        complete_patient(patient, queue_state.queue_patients, queue_state, scope)
+                        st.rerun()
+                with col6b:
+                    if st.button("⏳", key=f"{key_prefix}waiting_queue_{patient['id']}", help="Still Waiting"):
+                        st.info(f"{patient['name']} is still waiting")
     else:
-        base_rank = min(ranks)
-
-    # Determine if patient is in a vulnerable group
-    age = patient.get("age", 30)
-    is_vulnerable = (age <= 5) or (age >= 65) or is_vulnerable_by_condition
-
-    # Apply priority upgrade for vulnerable groups
-    if is_vulnerable:
-        # If it's a critical symptom (rank 1-2), it's flagged as highest emergency
-        if base_rank <= 2:
-            return 1
-        # For other symptoms, reduce rank by 1 (upgrade priority)
-        else:
-            return max(1, base_rank - 1)
+        st.info("No patients currently waiting in queue.")
 
-    return base_rank
+    # Section 2: Patients in Treatment
+    st.subheader("🩺 Patients in Treatment")
+    if queue_state.treatment_patients:
+        for patient in queue_state.treatment_patients:
+            treatment_mins = get_waiting_minutes(patient["treatment_start"])
+            expected_duration = patient["expected_duration"]
+            is_overdue = time.time() > patient_deadline(patient, rules)[1]
 
-def random_name():
-    return f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
+            col1, col2, col3, col4, col5, col6 = st.columns([2, 1.5, 1, 1, 1, 1])
 
-def assign_priority_from_rank(patient):
-    """Assigns priority level and color based on the calculated triage rank."""
-    rank = calculate_triage_rank(patient)
-    patient['rank'] = rank  # Store the rank in the patient dict
+            with col1:
+                if is_overdue:
+                    st.markdown(f"**🔴 {patient['name']}** (ID: {patient['id']})")
+                else:
+                    st.markdown(f"**{patient['name']}** (ID: {patient['id']})")
 
-    if rank <= 2:
-        priority_label = "🚨 Life-threatening (Critical)"
-        color = "red"
-    elif rank <= 5:
-        priority_label = "🟠 Vulnerable (High Priority)"
-        color = "orange"
-    else:
-        priority_label = "🟢 Standard Care"
-        color = "green"
-
-    return priority_label, color
-
-def make_mock_patient(idx=None, force_priority=None):
-    """Create one mock patient dict"""
-    age = random.choice([random.randint(1,4), random.randint(5,15), random.randint(16,40),
-                         random.randint(41,64), random.randint(65,90)])
-    critical = []
-    high_risk = []
-    other_symptoms = []
-
-    if force_priority == "critical" or random.random() < 0.12:
-        critical = random.sample(list(CRITICAL_SYMPTOMS.keys()), k=1)
-    if force_priority == "vulnerable" or random.random() < 0.2:
-        high_risk = random.sample(list(VULNERABLE_GROUPS_CONDITIONS.keys()), k=1)
-    other_symptoms = random.sample(list(OTHER_SYMPTOMS.keys()), k=random.randint(0,2))
-
-    patient = {
-        "id": idx if idx is not None else random.randint(1000,9999),
-        "name": random_name(),
-        "age": age,
-        "critical": critical,
-        "other_symptoms": other_symptoms,
-        "high_risk": high_risk,
-        "other_conditions": random.sample(list(OTHER_CONDITIONS.keys()), k=random.randint(0,1)),
-        "check_in": (datetime.now() - timedelta(minutes=random.randint(0,120))).isoformat(),
-        "status": random.choices(["waiting","in_treatment"], weights=[0.6,0.4])[0]
-    }
-    patient["priority"], patient["color"] = assign_priority_from_rank(patient)
-    return patient
+            with col2:
+                st.write(patient["priority"])
 
-def get_treatment_duration(patient):
-    """Get expected treatment duration based on patient's rank"""
-    rank = patient.get("rank", 10)  # Default to lowest priority
-    if rank <= 2:
-        return 15  # Critical
-    elif rank <= 5:
-        return 25  # High Priority
+            with col3:
+                st.write(f"{expected_duration} mins")
+
+            with col4:
+                if is_overdue:
+                    st.markdown(f"<span style='color: red; font-weight: bold;'>{treatment_mins} mins</span>", unsafe_allow_html=True)
+                else:
+                    st.write(f"{treatment_mins} mins")
+
+            with col5:
+                if is_overdue:
+                    st.markdown("<span style='color: red; font-weight: bold;'>OVERDUE</span>", unsafe_allow_html=True)
+                else:
+                    st.write("In Treatment")
+
+            with col6:
+                if st.button("✅", key=f"{key_prefix}complete_treatment_{patient['id']}", help="Mark as Complete"):
+                    # Move to completed
+                    complete_patient(patient, queue_state.treatment_patients, queue_state, scope)
+                    st.rerun()
     else:
-        return 10  # Standard
-
-def calculate_wait_time(patient, queue_position):
-    """Calculate estimated wait time for a patient based on rank."""
-    # The queue is sorted by rank, so all patients ahead have higher or equal priority.
-    # We just need to sum their estimated treatment times.
-    wait_time = 0
-    for i, p_ahead in enumerate(st.session_state.queue_patients):
-        if i >= queue_position:
-            break
-        wait_time += get_treatment_duration(p_ahead)
-
-    return wait_time
-
-def get_waiting_minutes(check_in_time):
-    """Calculate minutes since check-in"""
-    check_in = datetime.fromisoformat(check_in_time)
-    now = datetime.now()
-    return int((now - check_in).total_seconds() / 60)
+        st.info("No patients currently in treatment.")
+
+    # Section 3: Move next patient from queue to treatment
+    if queue_state.queue_patients:
+        st.subheader("🔄 Queue Management")
+        next_patient = queue_state.queue_patients[0]
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.write(f"**Next patient:** {next_patient['name']} ({next_patient['priority']})")
+        with col2:
+            if st.button("🚀 Start Treatment", key=f"{key_prefix}start_treatment"):
+                # Move from queue to treatment
+                treatment_patient = start_next_treatment(queue_state, get_treatment_duration(next_patient))
+                record_action("start_treatment", treatment_patient, scope=scope)
+                # Replaces the waiting timer with one for the treatment deadline
+                alert_engine.track(treatment_patient, scope=scope)
+                st.rerun()
 
 def initialize_sample_queue_data():
     """Initialize sample data for queue management"""
-    if not st.session_state.queue_patients and not st.session_state.treatment_patients:
+    if not state.queue_patients and not state.treatment_patients:
         # Sample waiting patients
         sample_waiting = [
             {
@@ -236,23 +304,25 @@ def initialize_sample_queue_data():
             }
         ]
 
-        st.session_state.queue_patients = sample_waiting
-        st.session_state.treatment_patients = sample_treatment
+        state.queue_patients = sample_waiting
+        state.treatment_patients = sample_treatment
+
+        for p in sample_waiting + sample_treatment:
+            p["is_sample"] = True
+            alert_engine.track(p, scope=st.session_state.alert_scope)
 
 # --------------------------
-# Initialize session storage
+# Opt-in rerun profiling (?profile=cprofile|sample or TRIAGE_PROFILE)
 # --------------------------
-if "patients" not in st.session_state:
-    st.session_state.patients = []
-    for i in range(18):
-        if i < 3:
-            p = make_mock_patient(idx=2000+i, force_priority="critical")
-        elif i < 7:
-            p = make_mock_patient(idx=2000+i, force_priority="vulnerable")
-        else:
-            p = make_mock_patient(idx=2000+i)
-        st.session_state.patients.append(p)
+rerun_profiler = get_rerun_profiler()
+# st.rerun() aborts the script before the end hook; close that run's profile here
+if st.session_state.get("active_profile") is not None:
+    rerun_profiler.end(st.session_state.active_profile)
+st.session_state.active_profile = rerun_profiler.begin(profiling_mode(st.query_params))
 
+# --------------------------
+# Initialize session storage
+# --------------------------
 if "current_patient_id" not in st.session_state:
     st.session_state.current_patient_id = None
 
@@ -267,17 +337,63 @@ if "form_selections" not in st.session_state:
         "other_conditions": []
     }
 
-# Initialize queue management data
-if "queue_patients" not in st.session_state:
-    st.session_state.queue_patients = []
-if "treatment_patients" not in st.session_state:
-    st.session_state.treatment_patients = []
-if "completed_patients" not in st.session_state:
-    st.session_state.completed_patients = []
-
 if "show_queue_management" not in st.session_state:
     st.session_state.show_queue_management = False
 
+# Identifies this session's data in the shared stores; also keeps alert
+# timers from different sessions apart
+if "alert_scope" not in st.session_state:
+    st.session_state.alert_scope = uuid.uuid4().hex
+
+alert_engine = get_alert_engine()
+patient_archive = get_patient_archive()
+duration_model = get_duration_model()
+trace_recorder = get_trace_recorder()
+
+# Patients, queues and IDs live in the session store rather than in
+# st.session_state; idle sessions are archived, evicted and start over when
+# they return
+session_store = get_session_store()
+state, state_created = session_store.get(st.session_state.alert_scope)
+if state_created and st.session_state.checkin_completed:
+    st.session_state.checkin_completed = False
+    st.session_state.current_patient_id = None
+    st.session_state.show_queue_management = False
+    st.info(f"This session was idle for over {session_store.idle_seconds // 60} minutes and has been reset; "
+            "its waiting and in-treatment patients were archived.")
+
+# Triage rules are swapped in by the watcher, which re-ranks every stored
+# session and the walk-in queue (re-arming waiting timers where the rank or
+# its wait target changed) as soon as they change. One RuleSet is used for
+# the whole rerun; apply_rules here only catches up a session created with
+# the older rules the mocks were ranked with
+get_rule_watcher()
+rules = current_rules()
+for patient in apply_rules(state, rules):
+    alert_engine.track(patient, scope=st.session_state.alert_scope)
+
+# Kiosk check-ins are consumed in the background into the shared walk-in queue
+walkin_queue = get_walkin_queue()
+with walkin_queue.lock:
+    for patient in apply_rules(walkin_queue.state, rules):
+        alert_engine.track(patient, scope=WALKIN_SCOPE)
+
+# A reload may have removed or renamed options this session had selected;
+# Streamlit rejects defaults that are not among a multiselect's options
+for selection_key, widget_key, names in (
+    ("critical", "critical_symptoms", rules.critical_symptom_names),
+    ("other", "other_symptoms", rules.other_symptom_names),
+    ("high_risk", "high_risk_conditions", rules.vulnerable_condition_names),
+    ("other_conditions", "other_conditions", rules.other_condition_names),
+):
+    st.session_state.form_selections[selection_key] = [
+        v for v in st.session_state.form_selections[selection_key] if v in names
+    ]
+    if widget_key in st.session_state:
+        kept = [v for v in st.session_state[widget_key] if v in names]
+        if kept != st.session_state[widget_key]:
+            st.session_state[widget_key] = kept
+
 # -------------------------
 # Page 1: Check-in form (always visible)
 # -------------------------
@@ -295,13 +411,13 @@ with st.form("checkin_form", clear_on_submit=False):
         age = st.number_input("Age", min_value=0, max_value=120, value=30, step=1)
 
     with st.expander("🔴 Critical Emergency Symptoms"):
-        selected_critical = st.multiselect("", list(CRITICAL_SYMPTOMS.keys()), default=st.session_state.form_selections["critical"], key="critical_symptoms")
+        selected_critical = st.multiselect("", rules.critical_symptom_names, default=st.session_state.form_selections["critical"], key="critical_symptoms")
     with st.expander("🟡 Other Current Symptoms"):
-        selected_other = st.multiselect("", list(OTHER_SYMPTOMS.keys()), default=st.session_state.form_selections["other"], key="other_symptoms")
+        selected_other = st.multiselect("", rules.other_symptom_names, default=st.session_state.form_selections["other"], key="other_symptoms")
     with st.expander("🟠 High-Risk Medical Conditions"):
-        selected_high_risk = st.multiselect("", list(VULNERABLE_GROUPS_CONDITIONS.keys()), default=st.session_state.form_selections["high_risk"], key="high_risk_conditions")
+        selected_high_risk = st.multiselect("", rules.vulnerable_condition_names, default=st.session_state.form_selections["high_risk"], key="high_risk_conditions")
     with st.expander("⚪ Other Medical Conditions"):
-        selected_other_conditions = st.multiselect("", list(OTHER_CONDITIONS.keys()), default=st.session_state.form_selections["other_conditions"], key="other_conditions")
+        selected_other_conditions = st.multiselect("", rules.other_condition_names, default=st.session_state.form_selections["other_conditions"], key="other_conditions")
 
     submitted = st.form_submit_button("✅ Complete Medical Check-in")
 
@@ -330,42 +446,23 @@ st.session_state.form_selections = {
 # Handle form submission
 if submitted:
     # Validate all required fields
-    errors = []
-
-    if not full_name.strip():
-        errors.append("Please enter a name.")
-
-    if age <= 0:
-        errors.append("Please enter a valid age.")
-
-    # Check if all categories are set to "None" or empty
-    all_none_or_empty = (
-        (not selected_critical or selected_critical == ["None"]) and
-        (not selected_other or selected_other == ["None"]) and
-        (not selected_high_risk or selected_high_risk == ["None"]) and
-        (not selected_other_conditions or selected_other_conditions == ["None"])
-    )
-
-    if all_none_or_empty:
-        errors.append("Please select at least one medical symptom or condition from any category to proceed.")
+    errors = validate_checkin(full_name, age, selected_critical, selected_other,
+                              selected_high_risk, selected_other_conditions)
 
     if errors:
         for error in errors:
             st.error(error)
     else:
-        new_patient = {
-            "id": random.randint(10000,99999),
-            "name": full_name.strip(),
-            "age": age,
-            "critical": selected_critical,
-            "other_symptoms": selected_other,
-            "high_risk": selected_high_risk,
-            "other_conditions": selected_other_conditions,
-            "check_in": datetime.now().isoformat(),
-            "status": "waiting"
-        }
-        new_patient["priority"], new_patient["color"] = assign_priority_from_rank(new_patient)
-        st.session_state.patients.append(new_patient)
+        new_patient = new_checkin_patient(
+            state.next_patient_id(), full_name.strip(), age,
+            selected_critical, selected_other, selected_high_risk, selected_other_conditions,
+            rules=rules
+        )
+        state.patients.append(new_patient)
+        record_action("arrive", new_patient, name=new_patient["name"], age=new_patient["age"],
+                      critical=selected_critical, other_symptoms=selected_other,
+                      high_risk=selected_high_risk, other_conditions=selected_other_conditions)
+        alert_engine.track(new_patient, scope=st.session_state.alert_scope)
         st.session_state.current_patient_id = new_patient["id"]
         st.session_state.checkin_completed = True
         st.success("✅ Check-in completed successfully! The dashboard is now available below.")
@@ -406,7 +503,7 @@ if st.session_state.checkin_completed:
     st.header("🩺 Triage Dashboard")
     st.write("Welcome to the emergency care dashboard. Your information has been added to the queue.")
 
-    patients = st.session_state.patients
+    patients = state.patients
     total_patients = len(patients)
     waiting_count = sum(1 for p in patients if p["status"] == "waiting")
     in_treatment_count = sum(1 for p in patients if p["status"] == "in_treatment")
@@ -504,154 +601,38 @@ if st.session_state.show_queue_management:
 
     # Add new patient from check-in to queue
     if st.session_state.checkin_completed and st.session_state.current_patient_id:
-        # Check if current patient is already in queue
-        current_patient_in_queue = any(p["id"] == st.session_state.current_patient_id for p in st.session_state.queue_patients)
-        if not current_patient_in_queue:
-            # Find the patient in the main patients list
-            current_patient = next((p for p in st.session_state.patients if p["id"] == st.session_state.current_patient_id), None)
-            if current_patient:
-                # Add to queue
-                queue_patient = {
-                    "id": current_patient["id"],
-                    "name": current_patient["name"],
-                    "priority": current_patient["priority"],
-                    "check_in": current_patient["check_in"],
-                    "age": current_patient["age"],
-                    "rank": current_patient.get("rank")
-                }
-                st.session_state.queue_patients.append(queue_patient)
+        # Find the patient in the main patients list; enqueue skips patients already queued
+        current_patient = next((p for p in state.patients if p["id"] == st.session_state.current_patient_id), None)
+        if current_patient:
+            enqueue_patient(state, current_patient)
 
     # Sort queue by priority rank and then check-in time
-    def priority_sort_key(patient):
-        return (patient.get('rank', 10), patient["check_in"])
-
-    st.session_state.queue_patients.sort(key=priority_sort_key)
-
-    # Section 1: Waiting Queue
-    st.subheader("⏳ Waiting Queue")
-    if st.session_state.queue_patients:
-        for i, patient in enumerate(st.session_state.queue_patients):
-            waited_mins = get_waiting_minutes(patient["check_in"])
-            est_remaining = calculate_wait_time(patient, i)
-            expected_wait = get_treatment_duration(patient)
-
-            # Check if patient is overdue
-            is_overdue = waited_mins > expected_wait
-
-            col1, col2, col3, col4, col5, col6 = st.columns([2, 1.5, 1, 1.5, 1, 1])
-
-            with col1:
-                if is_overdue:
-                    st.markdown(f"**🔴 {patient['name']}** (ID: {patient['id']})")
-                else:
-                    st.markdown(f"**{patient['name']}** (ID: {patient['id']})")
-
-            with col2:
-                st.write(patient["priority"])
-
-            with col3:
-                if is_overdue:
-                    st.markdown(f"<span style='color: red; font-weight: bold;'>{waited_mins} mins</span>", unsafe_allow_html=True)
-                else:
-                    st.write(f"{waited_mins} mins")
+    sort_queue(state)
 
-            with col4:
-                st.write(f"{est_remaining} mins")
-
-            with col5:
-                if is_overdue:
-                    st.markdown("<span style='color: red; font-weight: bold;'>OVERDUE</span>", unsafe_allow_html=True)
-                else:
-                    st.write("Waiting")
-
-            with col6:
-                col6a, col6b = st.columns(2)
-                with col6a:
-                    if st.button("✅", key=f"complete_queue_{patient['id']}", help="Mark as Complete"):
-                        # Move to completed
-                        st.session_state.completed_patients.append(patient)
-                        st.session_state.queue_patients.remove(patient)
-                        st.rerun()
-                with col6b:
-                    if st.button("⏳", key=f"waiting_queue_{patient['id']}", help="Still Waiting"):
-                        st.info(f"{patient['name']} is still waiting")
-    else:
-        st.info("No patients currently waiting in queue.")
-
-    # Section 2: Patients in Treatment
-    st.subheader("🩺 Patients in Treatment")
-    if st.session_state.treatment_patients:
-        for patient in st.session_state.treatment_patients:
-            treatment_mins = get_waiting_minutes(patient["treatment_start"])
-            expected_duration = patient["expected_duration"]
-            is_overdue = treatment_mins > expected_duration
-
-            col1, col2, col3, col4, col5, col6 = st.columns([2, 1.5, 1, 1, 1, 1])
+    render_queue(state, st.session_state.alert_scope)
 
-            with col1:
-                if is_overdue:
-                    st.markdown(f"**🔴 {patient['name']}** (ID: {patient['id']})")
-                else:
-                    st.markdown(f"**{patient['name']}** (ID: {patient['id']})")
-
-            with col2:
-                st.write(patient["priority"])
-
-            with col3:
-                st.write(f"{expected_duration} mins")
-
-            with col4:
-                if is_overdue:
-                    st.markdown(f"<span style='color: red; font-weight: bold;'>{treatment_mins} mins</span>", unsafe_allow_html=True)
-                else:
-                    st.write(f"{treatment_mins} mins")
-
-            with col5:
-                if is_overdue:
-                    st.markdown("<span style='color: red; font-weight: bold;'>OVERDUE</span>", unsafe_allow_html=True)
-                else:
-                    st.write("In Treatment")
-
-            with col6:
-                if st.button("✅", key=f"complete_treatment_{patient['id']}", help="Mark as Complete"):
-                    # Move to completed
-                    st.session_state.completed_patients.append(patient)
-                    st.session_state.treatment_patients.remove(patient)
-                    st.rerun()
-    else:
-        st.info("No patients currently in treatment.")
-
-    # Section 3: Move next patient from queue to treatment
-    if st.session_state.queue_patients:
-        st.subheader("🔄 Queue Management")
-        next__patient = st.session_state.queue_patients[0]
-
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            st.write(f"**Next patient:** {next_patient['name']} ({next_patient['priority']})")
-        with col2:
-            if st.button("🚀 Start Treatment", key="start_treatment"):
-                # Move from queue to treatment
-                treatment_patient = {
-                    "id": next_patient["id"],
-                    "name": next_patient["name"],
-                    "priority": next_patient["priority"],
-                    "rank": next_patient.get("rank"),
-                    "treatment_start": datetime.now().isoformat(),
-                    "expected_duration": get_treatment_duration(next_patient),
-                    "age": next_patient["age"]
-                }
-                st.session_state.treatment_patients.append(treatment_patient)
-                st.session_state.queue_patients.remove(next_patient)
-                st.rerun()
+    # Kiosk walk-ins: one queue shared by every staff session
+    st.markdown("---")
+    st.header("🚶 Kiosk Walk-ins")
+    st.caption("Patients checked in at the kiosk; shared by all dashboard sessions.")
+    with walkin_queue.lock:
+        render_queue(walkin_queue.state, WALKIN_SCOPE, key_prefix="walkin_")
 
     # Section 4: Statistics
     st.subheader("📊 Queue Statistics")
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Waiting", len(st.session_state.queue_patients))
-    col2.metric("In Treatment", len(st.session_state.treatment_patients))
-    col3.metric("Completed Today", len(st.session_state.completed_patients))
-    col4.metric("Total Active", len(st.session_state.queue_patients) + len(st.session_state.treatment_patients))
+    col1.metric("Waiting", len(state.queue_patients))
+    col2.metric("In Treatment", len(state.treatment_patients))
+    col3.metric("Completed Today", state.completed_count)
+    col4.metric("Total Active", len(state.queue_patients) + len(state.treatment_patients))
+
+    with st.expander("📈 Completed Patient Analytics"):
+        st.caption(f"Minutes per triage rank over the last {ANALYTICS_DAYS} days of archived encounters (refreshed every minute).")
+        analytics = load_rank_analytics()
+        if analytics.empty:
+            st.info("No completed encounters archived yet.")
+        else:
+            st.dataframe(analytics, use_container_width=True)
 
     # Section 5: Treatment Duration Guidelines
     with st.expander("ℹ️ Treatment Duration Guidelines"):
@@ -661,13 +642,31 @@ if st.session_state.show_queue_management:
         - 🟠 **Vulnerable (High Priority)**: ~25 minutes
         - 🟢 **General (Standard Care)**: ~10 minutes
 
+        Estimates are refined from completed treatments by rank, main symptom and age band.
+
         **Queue Priority Order:**
         1. Critical patients first
         2. Vulnerable patients second
         3. General patients last
 
         **Overdue Indicators:**
-        - Waiting time exceeds expected treatment duration
+        - Waiting time exceeds the wait-time target for the patient's rank
         - Treatment time exceeds expected duration
         - Highlighted in red for immediate attention
-        """)
\ No newline at end of file
+        """)
+
+# -------------------------
+# Profiler report (only when profiling is enabled)
+# -------------------------
+if st.session_state.active_profile is not None:
+    rerun_profiler.end(st.session_state.active_profile)
+    st.session_state.active_profile = None
+
+    st.markdown("---")
+    with st.expander(f"🔬 Profiler ({rerun_profiler.reruns} reruns, {rerun_profiler.rerun_seconds:.2f}s total)"):
+        st.dataframe(rerun_profiler.hot_functions(), use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Download .prof (cProfile)", rerun_profiler.pstats_bytes(), file_name="reruns.prof")
+        with col2:
+            st.download_button("Download folded stacks (flamegraph)", rerun_profiler.folded(), file_name="reruns.folded")
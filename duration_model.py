@@ -0,0 +1,117 @@
+"""Online treatment-duration estimator.
+
+Learns how long treatments actually take from completed encounters instead
+of the fixed 15/25/10 minute buckets. Statistics are kept per
+(rank, primary symptom, age band) with Welford running mean/variance, so an
+update is O(1). Predictions back off through coarser keys
+
+    (rank, symptom, age band) -> (rank, age band) -> (rank,) -> default
+
+shrinking each level toward its parent until it has seen enough
+completions, which keeps sparse combinations from producing wild estimates.
+"""
+import math
+import threading
+
+# Pseudo-count pulling a level toward its parent estimate.
+SHRINKAGE = 5
+# Completions longer than this are almost always a forgotten "✅" click.
+MAX_OBSERVED_MINUTES = 240
+
+AGE_BANDS = [(5, "0-5"), (15, "6-15"), (40, "16-40"), (64, "41-64")]
+
+
+def default_duration(rank):
+    """Fallback duration by rank bucket, used until data arrives."""
+    if rank <= 2:
+        return 15  # Critical
+    elif rank <= 5:
+        return 25  # High Priority
+    else:
+        return 10  # Standard
+
+
+def age_band(age):
+    for upper, label in AGE_BANDS:
+        if age <= upper:
+            return label
+    return "65+"
+
+
+def primary_symptom(patient):
+    """The patient's most specific complaint, in the form's category order."""
+    for key in ("critical", "other_symptoms", "other_conditions", "high_risk"):
+        for item in patient.get(key, []):
+            if item != "None":
+                return item
+    return None
+
+
+class _RunningStats:
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class DurationModel:
+    """Hierarchical running-mean model of treatment minutes."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(patient):
+        rank = patient.get("rank") or 10
+        band = age_band(patient.get("age", 30))
+        symptom = patient.get("symptom") or primary_symptom(patient)
+        return [(rank,), (rank, band), (rank, symptom, band)]
+
+    def observe(self, patient, minutes):
+        """Record one completed treatment for the patient's keys."""
+        minutes = min(max(minutes, 0.0), MAX_OBSERVED_MINUTES)
+        with self._lock:
+            for key in self._keys(patient):
+                stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = _RunningStats()
+                stats.add(minutes)
+
+    def predict(self, patient):
+        """Expected treatment minutes, rounded for display."""
+        rank = patient.get("rank") or 10
+        estimate = float(default_duration(rank))
+        for key in self._keys(patient):
+            stats = self._stats.get(key)
+            if stats is None:
+                break
+            estimate = (stats.count * stats.mean + SHRINKAGE * estimate) / (stats.count + SHRINKAGE)
+        return max(1, round(estimate))
+
+    def summary(self):
+        """Per-rank (count, mean, std) for display."""
+        return {
+            key[0]: (stats.count, round(stats.mean, 1), round(stats.std, 1))
+            for key, stats in self._stats.items()
+            if len(key) == 1
+        }
+
+    def fit_frame(self, df):
+        """Warm the model from archived rows (rank, age, symptom, treatment_min)."""
+        df = df.dropna(subset=["rank", "treatment_min"]).fillna({"age": 30})
+        for row in df.itertuples(index=False):
+            patient = {"rank": int(row.rank), "age": int(row.age), "symptom": row.symptom}
+            self.observe(patient, float(row.treatment_min))
@@ -0,0 +1,284 @@
+"""Multi-site queue federation with low-acuity diversion.
+
+Each ED site owns a `SiteShard`: its own waiting queue and treatment list
+(driven through triage_core) and its own DurationModel. Instead of shipping
+queue copies, a shard publishes a small summary whenever its queue changes:
+the predicted treatment minutes waiting at each rank. That total is kept
+incrementally (O(1) per enqueue/dequeue), so a summary costs the same at 10
+or 10,000 queued patients.
+
+The `Coordinator` keeps the latest summary per site and recommends diverting
+low-acuity arrivals (rank >= DIVERSION_MIN_RANK) to the site with the
+smallest predicted wait for their rank, if that saves more than
+DIVERSION_MIN_SAVING minutes. Higher-acuity patients always stay put.
+
+`python federation.py` runs a multi-process simulation (one process per site,
+coordinator in the parent) with diversion off and on, and prints a JSON
+report of waits, diversions and summary traffic. Sites run in lockstep: each
+acknowledges every minute tick, with its summary if it changed, before the
+coordinator routes the next minute's arrivals, so a seed always gives the
+same report. app.py still runs a single site and does not use this module.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import pickle
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from duration_model import DurationModel, default_duration
+from triage_core import (
+    make_mock_patient, new_checkin_patient, enqueue_patient, sort_queue,
+    start_next_treatment, finish_patient
+)
+
+DIVERSION_MIN_RANK = 6
+DIVERSION_MIN_SAVING = 20  # minutes
+RANKS = range(1, 11)
+
+SIM_EPOCH = datetime(2024, 1, 1, 8, 0, 0)
+
+
+# ---------------------
+# Site shard
+# ---------------------
+
+class SiteShard:
+    """One site's queue plus an incrementally maintained load summary."""
+
+    def __init__(self, site_id, beds=4):
+        self.site_id = site_id
+        self.beds = beds
+        self.state = SimpleNamespace(patients=[], queue_patients=[], treatment_patients=[], completed_count=0)
+        self.model = DurationModel()
+        self.work_by_rank = [0.0] * (len(RANKS) + 1)   # index 0 unused
+        self.version = 0
+
+    def arrive(self, patient):
+        queued = enqueue_patient(self.state, patient)
+        if queued is None:
+            return
+        queued["predicted"] = self.model.predict(queued)
+        self.work_by_rank[queued["rank"]] += queued["predicted"]
+        self.version += 1
+
+    def start_treatment(self, now):
+        """Fill free beds from the head of the queue; returns the started patients."""
+        started = []
+        if len(self.state.treatment_patients) >= self.beds or not self.state.queue_patients:
+            return started
+        sort_queue(self.state)
+        while len(self.state.treatment_patients) < self.beds and self.state.queue_patients:
+            head = self.state.queue_patients[0]
+            self.work_by_rank[head["rank"]] -= head["predicted"]
+            started.append(start_next_treatment(self.state, head["predicted"], now=now))
+            self.version += 1
+        return started
+
+    def complete(self, patient, now):
+        minutes = (now - datetime.fromisoformat(patient["treatment_start"])).total_seconds() / 60
+        self.model.observe(patient, minutes)
+        finish_patient(self.state, patient, self.state.treatment_patients)
+
+    def summary(self):
+        """What the coordinator needs: a few numbers, never the queue itself."""
+        return {
+            "site": self.site_id,
+            "version": self.version,
+            "beds": self.beds,
+            "waiting": len(self.state.queue_patients),
+            "work_by_rank": [round(w, 1) for w in self.work_by_rank],
+        }
+
+
+# ---------------------
+# Coordinator
+# ---------------------
+
+class Coordinator:
+    """Aggregates site summaries and recommends diversions."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.summaries = {}
+        self.updates = 0
+        self.update_bytes = 0
+
+    def update(self, summary):
+        current = self.summaries.get(summary["site"])
+        if current is not None and current["version"] >= summary["version"]:
+            return
+        self.summaries[summary["site"]] = summary
+        self.updates += 1
+        self.update_bytes += len(pickle.dumps(summary))
+
+    def predicted_wait(self, site, rank):
+        """Minutes until a new arrival of `rank` would reach a bed at `site`."""
+        summary = self.summaries.get(site)
+        if summary is None:
+            return 0.0
+        return sum(summary["work_by_rank"][1:rank + 1]) / summary["beds"]
+
+    def recommend(self, home_site, rank):
+        """Site the arrival should go to; `home_site` unless diversion clearly helps."""
+        if not self.enabled or rank < DIVERSION_MIN_RANK or not self.summaries:
+            return home_site
+        home_wait = self.predicted_wait(home_site, rank)
+        best = min(self.summaries, key=lambda site: self.predicted_wait(site, rank))
+        if home_wait - self.predicted_wait(best, rank) > DIVERSION_MIN_SAVING:
+            return best
+        return home_site
+
+
+# ---------------------
+# Multi-process simulation
+# ---------------------
+
+def _site_worker(site_id, beds, seed, inbox, outbox):
+    """Process body for one site: apply arrivals and minute ticks, publish summaries."""
+    rng = random.Random(seed)
+    shard = SiteShard(site_id, beds)
+    due = {}            # patient id -> completion datetime
+    waits = []          # (rank, minutes waited) per started patient
+    full_copy_bytes = 0
+    published = shard.version
+    now = SIM_EPOCH
+
+    while True:
+        message = inbox.get()
+        kind = message[0]
+        if kind == "arrive":
+            shard.arrive(message[1])
+        elif kind == "tick":
+            now = message[1]
+            for patient in [p for p in shard.state.treatment_patients if due[p["id"]] <= now]:
+                shard.complete(patient, now)
+            for patient in shard.start_treatment(now):
+                actual = default_duration(patient["rank"]) * rng.lognormvariate(0, 0.35)
+                due[patient["id"]] = now + timedelta(minutes=actual)
+                check_in = datetime.fromisoformat(patient["check_in"])
+                waits.append((patient["rank"], (now - check_in).total_seconds() / 60))
+            summary = None
+            if shard.version != published:
+                published = shard.version
+                summary = shard.summary()
+                # What a naive federation would ship instead.
+                full_copy_bytes += len(pickle.dumps(shard.state.queue_patients))
+            outbox.put(("ticked", site_id, summary))
+        elif kind == "stop":
+            # Patients still queued count with the wait they have so far.
+            for patient in shard.state.queue_patients:
+                check_in = datetime.fromisoformat(patient["check_in"])
+                waits.append((patient["rank"], (now - check_in).total_seconds() / 60))
+            outbox.put(("done", site_id, waits, full_copy_bytes, len(shard.state.queue_patients)))
+            return
+
+
+def _await_ticks(outbox, coordinator, sites):
+    """Block until every site has acknowledged the current tick."""
+    acked = set()
+    while len(acked) < sites:
+        _, site_id, summary = outbox.get()
+        acked.add(site_id)
+        if summary is not None:
+            coordinator.update(summary)
+
+
+def simulate(sites=4, beds=4, minutes=720, base_rate=0.15, seed=0, diversion=True):
+    """Run one shift; site 0 receives three times the arrivals of the others."""
+    rng = random.Random(seed)
+    outbox = mp.Queue()
+    inboxes = [mp.Queue() for _ in range(sites)]
+    workers = [mp.Process(target=_site_worker, args=(s, beds, seed + s, inboxes[s], outbox), daemon=True)
+               for s in range(sites)]
+    for w in workers:
+        w.start()
+
+    coordinator = Coordinator(enabled=diversion)
+    rates = [base_rate * (3 if s == 0 else 1) for s in range(sites)]
+    diverted = 0
+    arrivals = 0
+    recommend_seconds = 0.0
+
+    wall_start = time.perf_counter()
+    for minute in range(minutes):
+        now = SIM_EPOCH + timedelta(minutes=minute)
+        for home in range(sites):
+            # Poisson arrivals per minute via exponential gaps.
+            t = rng.expovariate(rates[home])
+            while t < 1.0:
+                mock = make_mock_patient(idx=arrivals, rng=rng, now=now)
+                patient = new_checkin_patient(arrivals, mock["name"], mock["age"], mock["critical"],
+                                              mock["other_symptoms"], mock["high_risk"], mock["other_conditions"],
+                                              now=now + timedelta(minutes=t))
+                started = time.perf_counter()
+                target = coordinator.recommend(home, patient["rank"])
+                recommend_seconds += time.perf_counter() - started
+                diverted += target != home
+                arrivals += 1
+                inboxes[target].put(("arrive", patient))
+                t += rng.expovariate(rates[home])
+        # Sites act at the end of the minute the arrivals fell in.
+        for inbox in inboxes:
+            inbox.put(("tick", now + timedelta(minutes=1)))
+        _await_ticks(outbox, coordinator, sites)
+
+    for inbox in inboxes:
+        inbox.put(("stop",))
+    results = {}
+    while len(results) < sites:
+        _, site_id, waits, full_copy_bytes, still_waiting = outbox.get()
+        results[site_id] = (waits, full_copy_bytes, still_waiting)
+    for w in workers:
+        w.join()
+    wall_seconds = time.perf_counter() - wall_start
+
+    def mean_wait(site_waits, low_acuity):
+        values = [m for rank, m in site_waits if (rank >= DIVERSION_MIN_RANK) == low_acuity]
+        return round(statistics.fmean(values), 1) if values else None
+
+    all_waits = [w for waits, _, _ in results.values() for w in waits]
+    return {
+        "diversion": diversion,
+        "arrivals": arrivals,
+        "diverted": diverted,
+        "wall_seconds": round(wall_seconds, 2),
+        "recommend_us_mean": round(recommend_seconds / max(arrivals, 1) * 1e6, 2),
+        "mean_wait_low_acuity": mean_wait(all_waits, True),
+        "mean_wait_high_acuity": mean_wait(all_waits, False),
+        "summary_updates": coordinator.updates,
+        "summary_bytes": coordinator.update_bytes,
+        "full_copy_bytes": sum(b for _, b, _ in results.values()),
+        "per_site": {
+            site: {
+                "treated": len(waits) - still_waiting,
+                "still_waiting": still_waiting,
+                "mean_wait_low_acuity": mean_wait(waits, True),
+                "mean_wait_high_acuity": mean_wait(waits, False),
+            }
+            for site, (waits, _, still_waiting) in sorted(results.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", type=int, default=4)
+    parser.add_argument("--beds", type=int, default=4)
+    parser.add_argument("--minutes", type=int, default=720, help="simulated shift length")
+    parser.add_argument("--rate", type=float, default=0.15, help="arrivals per minute at a normal site")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = [
+        simulate(args.sites, args.beds, args.minutes, args.rate, args.seed, diversion=enabled)
+        for enabled in (False, True)
+    ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""Asynchronous check-in intake for walk-in kiosks.
+
+`IntakePipeline.submit` hands the validated form to an asyncio queue running
+on a background thread and returns a ticket number straight away; the kiosk
+page never waits for scoring or disk I/O. A worker coroutine drains the
+queue in batches, scores each submission with triage_core and appends the
+resulting patients to a JSONL intake log in a thread-pool executor. Ticket
+numbers and patient IDs continue from the last entry in that log, so they
+stay unique across restarts.
+`status(ticket)` reports the outcome once the worker has processed it; a
+batch that fails to score or persist is logged and its tickets are marked
+"failed" so the worker keeps serving later submissions.
+
+The log is also the hand-off to the dashboard: kiosk.py usually runs as its
+own Streamlit server. app.py runs one `WalkInQueue` per process. Its
+`IntakeFeed` consumes each logged check-in exactly once into a walk-in queue
+shared by every session, and the consumed offset is persisted so check-ins
+logged before the dashboard started are not lost.
+
+`python intake.py` benchmarks submit latency and end-to-end throughput with
+many concurrent kiosk sessions sharing one pipeline.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from triage_core import IdAllocator, new_checkin_patient, assign_priority_from_rank, enqueue_patient, sort_queue
+from triage_rules import current_rules
+
+# Ticket statuses kept for lookup; the oldest are forgotten past this.
+MAX_TICKETS = 10000
+
+# Kiosk patient IDs start here, clear of the dashboard sessions' IDs.
+FIRST_PATIENT_ID = 50000
+
+logger = logging.getLogger(__name__)
+
+
+def last_logged(path, tail_bytes=65536):
+    """Highest (ticket number, patient id) in the tail of an intake log; (0, 0) if none.
+
+    Entries are appended in ticket order, so the tail holds the maxima; they
+    are still taken over every readable line rather than trusting the last
+    one, and torn or partial lines are skipped.
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - tail_bytes))
+            lines = f.read().splitlines()
+    except OSError:
+        return 0, 0
+    last_ticket = last_patient_id = 0
+    for line in lines:
+        try:
+            entry = json.loads(line)
+            ticket, patient_id = int(entry["ticket"][1:]), int(entry["id"])
+        except (ValueError, KeyError, TypeError):
+            continue
+        last_ticket = max(last_ticket, ticket)
+        last_patient_id = max(last_patient_id, patient_id)
+    return last_ticket, last_patient_id
+
+
+class IntakePipeline:
+    """Ticketed, non-blocking check-in submission shared by all kiosk sessions."""
+
+    def __init__(self, path="intake_log.jsonl", batch_size=64):
+        self.path = path
+        self.batch_size = batch_size
+        self.submitted = 0
+        self.processed = 0
+        self._tickets = OrderedDict()
+        last_ticket, last_patient_id = last_logged(path)
+        self._ticket_numbers = itertools.count(last_ticket + 1)
+        self._next_patient_id = IdAllocator(start=max(last_patient_id + 1, FIRST_PATIENT_ID))
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="intake-io")
+
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="intake", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    # ---------------------
+    # Kiosk side
+    # ---------------------
+
+    def submit(self, name, age, critical, other_symptoms, high_risk, other_conditions):
+        """Enqueue an already-validated check-in and return its ticket number."""
+        form = (name.strip(), age, critical, other_symptoms, high_risk, other_conditions)
+        with self._lock:
+            ticket = f"K{next(self._ticket_numbers):05d}"
+            self._tickets[ticket] = {"status": "queued"}
+            if len(self._tickets) > MAX_TICKETS:
+                self._tickets.popitem(last=False)
+            self.submitted += 1
+            # Enqueued under the lock so the log is written in ticket order.
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, (ticket, form))
+        return ticket
+
+    def status(self, ticket):
+        with self._lock:
+            return self._tickets.get(ticket)
+
+    def drain(self, timeout=None):
+        """Block until every submission so far has been processed."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self.processed >= self.submitted, timeout)
+
+    # ---------------------
+    # Worker side
+    # ---------------------
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._loop.create_task(self._worker())
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                scored = [(ticket, dict(new_checkin_patient(self._next_patient_id(), *form), ticket=ticket))
+                          for ticket, form in batch]
+                await self._loop.run_in_executor(self._executor, self._persist, [p for _, p in scored])
+                outcomes = {
+                    ticket: {
+                        "status": "checked_in",
+                        "patient_id": patient["id"],
+                        "rank": patient["rank"],
+                        "priority": patient["priority"],
+                    }
+                    for ticket, patient in scored
+                }
+            except Exception:
+                logger.exception("Intake batch of %d check-ins failed", len(batch))
+                outcomes = {ticket: {"status": "failed"} for ticket, _ in batch}
+
+            with self._lock:
+                for ticket, outcome in outcomes.items():
+                    if ticket in self._tickets:
+                        self._tickets[ticket] = outcome
+                self.processed += len(batch)
+                self._idle.notify_all()
+
+    def _persist(self, patients):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(p) + "\n" for p in patients)
+
+
+class IntakeFeed:
+    """Consumes an intake log exactly once, persisting how far it has read.
+
+    The consumed byte offset is kept next to the log (`<path>.offset`), so a
+    dashboard started after check-ins were logged still picks them up and a
+    restart does not replay what was already consumed. One dashboard process
+    should consume a given log.
+    """
+
+    def __init__(self, path="intake_log.jsonl", offset_path=None):
+        self.path = path
+        self.offset_path = offset_path or path + ".offset"
+        self._offset = self._load_offset()
+        self._lock = threading.Lock()
+
+    def _load_offset(self):
+        try:
+            with open(self.offset_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_offset(self):
+        staging = self.offset_path + ".tmp"
+        with open(staging, "w", encoding="utf-8") as f:
+            f.write(str(self._offset))
+        os.replace(staging, self.offset_path)
+
+    def consume(self, handle):
+        """Pass each complete entry logged since the last call to `handle`; returns how many.
+
+        The offset only moves past entries `handle` returned from, so an
+        entry whose handling raised is offered again on the next call.
+        """
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                return 0
+            if size < self._offset:
+                logger.warning("%s shrank below the consumed offset; reading it from the start", self.path)
+                self._offset = 0
+            if size == self._offset:
+                return 0
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read(size - self._offset)
+
+            consumed = 0
+            start = self._offset
+            try:
+                # An unfinished last line stays unconsumed until the writer completes it.
+                for line in data.splitlines(keepends=True):
+                    if not line.endswith(b"\n"):
+                        break
+                    if line.strip():
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            logger.warning("Skipping unreadable line in %s", self.path)
+                        else:
+                            handle(entry)
+                            consumed += 1
+                    self._offset += len(line)
+            finally:
+                if self._offset != start:
+                    self._save_offset()
+            return consumed
+
+
+class WalkInQueue:
+    """The one process-wide queue kiosk check-ins land in, shared by every dashboard session.
+
+    A background thread consumes the intake log into `state`, which has the
+    shape triage_core's transitions take, and calls `on_arrival` with each
+    new queue entry. Hold `lock` while reading or changing `state`.
+    """
+
+    def __init__(self, feed, on_arrival=None, interval=1.0):
+        self.feed = feed
+        self.on_arrival = on_arrival
+        self.interval = interval
+        self.lock = threading.RLock()
+        self.state = SimpleNamespace(patients=[], queue_patients=[], treatment_patients=[],
+                                     completed_count=0, rules=current_rules())
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _admit(self, entry):
+        patient = dict(entry)
+        patient["priority"], patient["color"] = assign_priority_from_rank(patient, self.state.rules)
+        # enqueue_patient skips IDs already queued, so a re-offered entry is harmless
+        queued = enqueue_patient(self.state, patient)
+        if queued is not None and self.on_arrival is not None:
+            self.on_arrival(queued)
+
+    def poll(self):
+        """Move newly logged check-ins into the queue; returns how many arrived."""
+        with self.lock:
+            arrived = self.feed.consume(self._admit)
+            if arrived:
+                sort_queue(self.state)
+            return arrived
+
+    def start(self):
+        if self._thread is None:
+            self.poll()
+            self._thread = threading.Thread(target=self._run, name="walk-in-queue", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Reading kiosk check-ins from %s failed", self.feed.path)
+
+
+# ---------------------
+# Benchmark
+# ---------------------
+
+def benchmark(sessions=200, per_session=50, path="intake_bench.jsonl"):
+    """Concurrent kiosk sessions hammering one pipeline."""
+    pipeline = IntakePipeline(path=path)
+    latencies = [[] for _ in range(sessions)]
+    start_gate = threading.Barrier(sessions + 1)
+
+    def kiosk(n):
+        start_gate.wait()
+        for i in range(per_session):
+            started = time.perf_counter()
+            pipeline.submit(f"Kiosk {n} Patient {i}", 20 + (i % 60), [], ["Dizziness"], [], [])
+            latencies[n].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=kiosk, args=(n,)) for n in range(sessions)]
+    for t in threads:
+        t.start()
+    start_gate.wait()
+    wall_start = time.perf_counter()
+    for t in threads:
+        t.join()
+    submitted_at = time.perf_counter()
+    pipeline.drain()
+    finished_at = time.perf_counter()
+
+    ordered = sorted(v for session in latencies for v in session)
+    total = len(ordered)
+    return {
+        "sessions": sessions,
+        "submissions": total,
+        "submit_us_mean": round(statistics.fmean(ordered) * 1e6, 2),
+        "submit_us_p50": round(ordered[total // 2] * 1e6, 2),
+        "submit_us_p99": round(ordered[min(total - 1, int(total * 0.99))] * 1e6, 2),
+        "submit_per_second": round(total / (submitted_at - wall_start)),
+        "processed_per_second": round(total / (finished_at - wall_start)),
+        "drain_seconds_after_last_submit": round(finished_at - submitted_at, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent kiosk sessions")
+    parser.add_argument("--submissions", type=int, default=50, help="check-ins per session")
+    parser.add_argument("--output", default="intake_bench.jsonl", help="intake log written by the benchmark")
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.sessions, args.submissions, args.output), indent=2))
+
+
+if __name__ == "__main__":
+    main()
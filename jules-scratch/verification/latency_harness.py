@@ -0,0 +1,279 @@
+"""Headless latency harness for the check-in -> dashboard -> queue flow.
+
+Drives app.py through Playwright against a local Streamlit server and writes a
+JSON report that can be trended across releases:
+
+- time-to-dashboard after "Complete Medical Check-in"
+- time per "Start Treatment" and "✅" (complete treatment) action
+- websocket bytes received per action
+- all of the above bucketed by waiting-queue size
+
+Usage (from the repo root):
+
+    python jules-scratch/verification/latency_harness.py --launch \
+        --queue-sizes 5,10,20 --repeats 3 --output latency_report.json
+
+Without --launch the harness expects a server already running at --url.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+from playwright.sync_api import sync_playwright, expect
+
+# Waiting patients added by initialize_sample_queue_data() on the first
+# visit to the queue management page.
+SEEDED_WAITING = 4
+
+# A rerun is considered finished once the server has been quiet this long.
+QUIET_MS = 300
+ACTION_TIMEOUT_MS = 30000
+
+
+# ---------------------
+# Websocket accounting
+# ---------------------
+
+class FrameRecorder:
+    """Collects (timestamp, size) for every websocket frame the page receives."""
+
+    def __init__(self, page):
+        self.frames = []
+        page.on("websocket", self._attach)
+
+    def _attach(self, ws):
+        ws.on("framereceived", self._record)
+
+    def _record(self, payload):
+        self.frames.append((time.perf_counter(), len(payload)))
+
+    def mark(self):
+        return len(self.frames)
+
+    def since(self, mark):
+        return self.frames[mark:]
+
+
+def wait_for_quiet(page, recorder, mark, started):
+    """Pump the event loop until the rerun's frames stop arriving.
+
+    Returns (latency_ms, bytes_received) measured from `started` to the last
+    frame of the rerun triggered by the action.
+    """
+    deadline = started + ACTION_TIMEOUT_MS / 1000
+    while time.perf_counter() < deadline:
+        page.wait_for_timeout(50)
+        frames = recorder.since(mark)
+        if frames and (time.perf_counter() - frames[-1][0]) * 1000 >= QUIET_MS:
+            return (frames[-1][0] - started) * 1000, sum(size for _, size in frames)
+    raise TimeoutError("Streamlit rerun did not settle within %d ms" % ACTION_TIMEOUT_MS)
+
+
+def timed_action(page, recorder, action):
+    mark = recorder.mark()
+    started = time.perf_counter()
+    action()
+    return wait_for_quiet(page, recorder, mark, started)
+
+
+# ---------------------
+# App interactions
+# ---------------------
+
+def check_in(page, recorder, name):
+    """Submit the check-in form; returns (ms until dashboard visible, ms until settled, bytes)."""
+    page.get_by_label("Full Name").fill(name)
+    page.get_by_label("Age").fill("50")
+
+    # Multiselect state survives "Start New Check-in", so only pick once.
+    critical = page.locator('[data-testid="stMultiSelect"]').first
+    if "Severe chest pain" not in critical.inner_text():
+        page.get_by_text("Critical Emergency Symptoms").click()
+        critical.click()
+        page.get_by_text("Severe chest pain").click()
+        page.get_by_text("Critical Emergency Symptoms").click()
+
+    mark = recorder.mark()
+    started = time.perf_counter()
+    page.get_by_role("button", name="Complete Medical Check-in").click()
+    expect(page.get_by_role("heading", name="🩺 Triage Dashboard")).to_be_visible(timeout=ACTION_TIMEOUT_MS)
+    visible_ms = (time.perf_counter() - started) * 1000
+    settled_ms, size = wait_for_quiet(page, recorder, mark, started)
+    return visible_ms, settled_ms, size
+
+
+def open_queue_management(page, recorder):
+    timed_action(page, recorder, lambda: page.get_by_role("button", name="View Emergency Queue Management").click())
+    expect(page.get_by_role("heading", name="🚨 Emergency Queue Management")).to_be_visible(timeout=ACTION_TIMEOUT_MS)
+
+
+def start_new_check_in(page, recorder):
+    timed_action(page, recorder, lambda: page.get_by_role("button", name="Start New Check-in").click())
+
+
+def start_treatment(page, recorder):
+    return timed_action(page, recorder, lambda: page.get_by_role("button", name="Start Treatment").click())
+
+
+def complete_treatment(page, recorder):
+    # The treatment section renders after the waiting queue, so its ✅ buttons come last.
+    return timed_action(page, recorder, lambda: page.get_by_role("button", name="✅", exact=True).last.click())
+
+
+# ---------------------
+# Reporting
+# ---------------------
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 2),
+        "p50": round(ordered[len(ordered) // 2], 2),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------------
+# Server management
+# ---------------------
+
+def launch_server(port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py",
+         "--server.headless", "true", "--server.port", str(port),
+         "--browser.gatherUsageStats", "false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    health = f"http://localhost:{port}/_stcore/health"
+    for _ in range(120):
+        try:
+            with urllib.request.urlopen(health, timeout=1) as resp:
+                if resp.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("Streamlit server did not become healthy")
+
+
+# ---------------------
+# Main run
+# ---------------------
+
+def run(playwright, url, queue_sizes, repeats):
+    browser = playwright.chromium.launch(headless=True)
+    page = browser.new_page()
+    recorder = FrameRecorder(page)
+
+    page.goto(url)
+    expect(page.get_by_role("heading", name="📋 Medical Check-in Form")).to_be_visible(timeout=ACTION_TIMEOUT_MS)
+    initial_load_bytes = sum(size for _, size in recorder.since(0))
+
+    dashboard_visible, dashboard_settled, dashboard_bytes = [], [], []
+    per_size = []
+    waiting = SEEDED_WAITING
+    checkins = 0
+
+    for size in queue_sizes:
+        start_ms, start_bytes, complete_ms, complete_bytes = [], [], [], []
+        for _ in range(repeats):
+            # Top the waiting queue up to the target size; each check-in joins
+            # the queue when the management page is opened.
+            while checkins == 0 or waiting < size:
+                if checkins:
+                    start_new_check_in(page, recorder)
+                checkins += 1
+                visible, settled, size_bytes = check_in(page, recorder, f"Latency Patient {checkins}")
+                dashboard_visible.append(visible)
+                dashboard_settled.append(settled)
+                dashboard_bytes.append(size_bytes)
+                open_queue_management(page, recorder)
+                waiting += 1
+
+            ms, size_bytes = start_treatment(page, recorder)
+            start_ms.append(ms)
+            start_bytes.append(size_bytes)
+            waiting -= 1
+
+            ms, size_bytes = complete_treatment(page, recorder)
+            complete_ms.append(ms)
+            complete_bytes.append(size_bytes)
+
+        per_size.append({
+            "queue_size": size,
+            "start_treatment_ms": summarize(start_ms),
+            "start_treatment_ws_bytes": summarize(start_bytes),
+            "complete_ms": summarize(complete_ms),
+            "complete_ws_bytes": summarize(complete_bytes),
+        })
+
+    browser.close()
+
+    return {
+        "initial_load_ws_bytes": initial_load_bytes,
+        "checkins": checkins,
+        "time_to_dashboard_visible_ms": summarize(dashboard_visible),
+        "time_to_dashboard_settled_ms": summarize(dashboard_settled),
+        "checkin_ws_bytes": summarize(dashboard_bytes),
+        "per_queue_size": per_size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8501")
+    parser.add_argument("--launch", action="store_true", help="start `streamlit run app.py` for the duration of the run")
+    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--queue-sizes", default="5,10,20", help="comma-separated waiting-queue sizes to measure at")
+    parser.add_argument("--repeats", type=int, default=3, help="Start Treatment/✅ pairs measured per queue size")
+    parser.add_argument("--output", default="latency_report.json")
+    args = parser.parse_args()
+
+    queue_sizes = sorted(int(s) for s in args.queue_sizes.split(",") if s.strip())
+    server = None
+    url = args.url
+    if args.launch:
+        server = launch_server(args.port)
+        url = f"http://localhost:{args.port}"
+
+    try:
+        with sync_playwright() as playwright:
+            results = run(playwright, url, queue_sizes, args.repeats)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "url": url,
+        "quiet_ms": QUIET_MS,
+        "repeats": args.repeats,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import streamlit as st
+
+from intake import IntakePipeline
+from triage_core import validate_checkin
+from triage_rules import RuleWatcher, current_rules
+
+st.set_page_config(page_title="Walk-in Check-in Kiosk", layout="centered")
+
+# Kiosk mode renders only the check-in form. Submissions go to a shared
+# background intake pipeline, so the page returns a ticket immediately
+# instead of scoring, persisting and rerunning the dashboard. app.py consumes
+# intake_log.jsonl once into the walk-in queue shared by all staff sessions.
+
+@st.cache_resource
+def get_intake_pipeline():
+    """Process-wide intake pipeline shared by every kiosk session"""
+    return IntakePipeline("intake_log.jsonl")
+
+@st.cache_resource
+def get_rule_watcher():
+    """Hot-reloads triage_rules.json without restarting the server"""
+    return RuleWatcher().start()
+
+pipeline = get_intake_pipeline()
+get_rule_watcher()
+rules = current_rules()
+
+st.title("🏥 Walk-in Check-in")
+
+with st.form("kiosk_checkin_form", clear_on_submit=True):
+    full_name = st.text_input("Full Name", placeholder="Enter your full name")
+    age = st.number_input("Age", min_value=0, max_value=120, value=30, step=1)
+    selected_critical = st.multiselect("🔴 Critical Emergency Symptoms", rules.critical_symptom_names)
+    selected_other = st.multiselect("🟡 Other Current Symptoms", rules.other_symptom_names)
+    selected_high_risk = st.multiselect("🟠 High-Risk Medical Conditions", rules.vulnerable_condition_names)
+    selected_other_conditions = st.multiselect("⚪ Other Medical Conditions", rules.other_condition_names)
+    submitted = st.form_submit_button("✅ Check In")
+
+if submitted:
+    errors = validate_checkin(full_name, age, selected_critical, selected_other,
+                              selected_high_risk, selected_other_conditions)
+    if errors:
+        for error in errors:
+            st.error(error)
+    else:
+        ticket = pipeline.submit(full_name, age, selected_critical, selected_other,
+                                 selected_high_risk, selected_other_conditions)
+        st.session_state.last_ticket = ticket
+
+if "last_ticket" in st.session_state:
+    ticket = st.session_state.last_ticket
+    st.success(f"Your ticket number is **{ticket}**. Please take a seat; staff will call your number.")
+    status = pipeline.status(ticket)
+    if status and status["status"] == "checked_in":
+        st.caption(f"Checked in — {status['priority']}")
+    elif status and status["status"] == "failed":
+        st.error("Your check-in could not be recorded. Please see the front desk.")
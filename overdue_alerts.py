@@ -0,0 +1,194 @@
+"""Background overdue alerting for the emergency queue.
+
+Every tracked patient gets one timer on a hashed timer wheel, keyed on the
+moment they breach:
+
+- waiting patients:      check_in + the rank's wait-time target (triage_rules)
+- patients in treatment: treatment_start + expected_duration
+
+Scheduling and cancellation are O(1); each tick only visits one wheel slot,
+so the cost of a tick does not grow with the size of the queue. Fired
+events go to a sink (any callable taking an event dict); a sink that raises
+is logged per event and never stops the engine.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+
+from triage_rules import current_rules
+
+logger = logging.getLogger(__name__)
+
+def patient_deadline(patient, rules=None):
+    """Return (phase, deadline as a unix timestamp) for a queue or treatment patient."""
+    if patient.get("treatment_start"):
+        start = datetime.fromisoformat(patient["treatment_start"]).timestamp()
+        return "treatment", start + patient.get("expected_duration", 0) * 60
+
+    rank = patient.get("rank") or 10
+    minutes = (rules or current_rules()).wait_time_minutes
+    check_in = datetime.fromisoformat(patient["check_in"]).timestamp()
+    return "waiting", check_in + minutes.get(rank, minutes[10]) * 60
+
+
+class TimerWheel:
+    """Hashed timer wheel; not thread-safe on its own."""
+
+    def __init__(self, tick_seconds=1.0, slots=512, now=None):
+        self.tick_seconds = tick_seconds
+        self.slots = [dict() for _ in range(slots)]
+        self._index = {}    # key -> slot number, for O(1) cancel
+        self.current_tick = self._tick_for(time.time() if now is None else now)
+
+    def _tick_for(self, timestamp):
+        return math.floor(timestamp / self.tick_seconds)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def schedule(self, key, deadline, payload=None):
+        """Schedule (or reschedule) `key` to fire at `deadline`."""
+        self.cancel(key)
+        due_tick = max(math.ceil(deadline / self.tick_seconds), self.current_tick + 1)
+        slot = due_tick % len(self.slots)
+        self.slots[slot][key] = (due_tick, deadline, payload)
+        self._index[key] = slot
+
+    def cancel(self, key):
+        """Drop the timer for `key`; returns True if one was pending."""
+        slot = self._index.pop(key, None)
+        if slot is None:
+            return False
+        del self.slots[slot][key]
+        return True
+
+    def advance(self, now):
+        """Move the wheel up to `now`; returns [(key, deadline, payload)] that fired."""
+        target = self._tick_for(now)
+        if target <= self.current_tick:
+            return []
+
+        # After a long stall every slot is due for a visit anyway.
+        if target - self.current_tick >= len(self.slots):
+            visits = range(len(self.slots))
+        else:
+            visits = (t % len(self.slots) for t in range(self.current_tick + 1, target + 1))
+
+        fired = []
+        for slot in visits:
+            bucket = self.slots[slot]
+            due = [key for key, (due_tick, _, _) in bucket.items() if due_tick <= target]
+            for key in due:
+                _, deadline, payload = bucket.pop(key)
+                del self._index[key]
+                fired.append((key, deadline, payload))
+
+        self.current_tick = target
+        fired.sort(key=lambda item: item[1])
+        return fired
+
+
+class JsonlFileSink:
+    """Append each alert event as one JSON line to a local file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+class OverdueAlertEngine:
+    """Background thread that advances a TimerWheel and emits overdue events."""
+
+    def __init__(self, sink, tick_seconds=1.0, slots=512, now=None):
+        self.sink = sink
+        self.tick_seconds = tick_seconds
+        self.failed = 0
+        self._wheel = TimerWheel(tick_seconds=tick_seconds, slots=slots, now=now)
+        self._scopes = {}   # scope -> patient ids with a pending timer
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def track(self, patient, scope=None):
+        """Arm (or re-arm) the patient's timer for their current phase.
+
+        Called on check-in and again on treatment start; the treatment timer
+        replaces the waiting one since both share the same key.
+        """
+        phase, deadline = patient_deadline(patient)
+        payload = {
+            "patient_id": patient["id"],
+            "name": patient.get("name"),
+            "rank": patient.get("rank"),
+            "priority": patient.get("priority"),
+            "phase": phase,
+        }
+        with self._lock:
+            self._wheel.schedule((scope, patient["id"]), deadline, payload)
+            self._scopes.setdefault(scope, set()).add(patient["id"])
+
+    def cancel(self, patient_id, scope=None):
+        """Stop tracking a patient, e.g. on completion."""
+        with self._lock:
+            self._scopes.get(scope, set()).discard(patient_id)
+            return self._wheel.cancel((scope, patient_id))
+
+    def cancel_scope(self, scope):
+        """Stop tracking every patient of a session, e.g. when its data is evicted."""
+        with self._lock:
+            for patient_id in self._scopes.pop(scope, ()):
+                self._wheel.cancel((scope, patient_id))
+
+    def pending(self):
+        with self._lock:
+            return len(self._wheel)
+
+    def poll(self, now=None):
+        """Fire every timer due at `now`; used by the background thread."""
+        now = time.time() if now is None else now
+        with self._lock:
+            fired = self._wheel.advance(now)
+            for (scope, patient_id), _, _ in fired:
+                self._scopes.get(scope, set()).discard(patient_id)
+        for (scope, _), deadline, payload in fired:
+            event = dict(payload)
+            event["scope"] = scope
+            event["deadline"] = datetime.fromtimestamp(deadline).isoformat()
+            event["fired_at"] = datetime.fromtimestamp(now).isoformat()
+            # The timer is already off the wheel, so a failed delivery is
+            # logged (with the event) rather than allowed to kill the thread.
+            try:
+                self.sink(event)
+            except Exception:
+                self.failed += 1
+                logger.exception("Could not deliver overdue alert %s", event)
+        return len(fired)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="overdue-alerts", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.tick_seconds):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Overdue alert tick failed")
@@ -0,0 +1,225 @@
+"""Compressed, day-partitioned Parquet archive of completed encounters.
+
+Completed patients are handed to `PatientArchive.record`, which only enqueues
+a flat row; a background writer batches rows and writes zstd-compressed
+Parquet files under `<root>/day=YYYY-MM-DD/`. Sessions therefore keep a
+counter instead of an ever-growing `completed_patients` list.
+
+Every flush adds a small file to its day's partition; once a day holds
+`compact_files` of them the writer merges them into one, so the file count
+stays bounded over a long deployment. Analytics read the archive back as an
+Arrow dataset (pruning by day partition, so callers should pass a window)
+and compute per-rank percentiles with vectorized pandas groupbys.
+Rows have an `outcome`: "completed", or "evicted" for patients still waiting
+or in treatment when their idle session was dropped. `load` skips evicted
+rows unless asked, so they never count as completed encounters.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("scope", pa.string()),
+    ("age", pa.int32()),
+    ("rank", pa.int8()),
+    ("priority", pa.string()),
+    ("symptom", pa.string()),
+    ("check_in", pa.timestamp("s")),
+    ("treatment_start", pa.timestamp("s")),
+    ("completed_at", pa.timestamp("s")),
+    ("door_to_treatment_min", pa.float32()),
+    ("treatment_min", pa.float32()),
+    ("outcome", pa.string()),
+])
+
+PERCENTILES = [0.5, 0.9, 0.95]
+
+logger = logging.getLogger(__name__)
+
+
+def _parse(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _minutes(start, end):
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds() / 60
+
+
+def archive_row(patient, completed_at=None, scope=None, outcome="completed"):
+    """Flatten a queue/treatment patient dict into one archive row."""
+    completed_at = completed_at or datetime.now()
+    check_in = _parse(patient.get("check_in"))
+    treatment_start = _parse(patient.get("treatment_start"))
+    return {
+        "id": patient["id"],
+        "scope": scope,
+        "age": patient.get("age"),
+        "rank": patient.get("rank"),
+        "priority": patient.get("priority"),
+        "symptom": patient.get("symptom"),
+        "check_in": check_in,
+        "treatment_start": treatment_start,
+        "completed_at": completed_at,
+        "door_to_treatment_min": _minutes(check_in, treatment_start),
+        "treatment_min": _minutes(treatment_start, completed_at),
+        "outcome": outcome,
+    }
+
+
+class PatientArchive:
+    """Append-only archive with a background batching writer."""
+
+    def __init__(self, root="patient_archive", batch_size=256, flush_seconds=30.0, compact_files=16):
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.compact_files = compact_files
+        self.dropped_rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="patient-archive", daemon=True)
+        self._thread.start()
+
+    # ---------------------
+    # Hot path
+    # ---------------------
+
+    def record(self, patient, completed_at=None, scope=None, outcome="completed"):
+        """Queue a completed (or evicted) patient for archiving; never touches disk."""
+        self._queue.put(archive_row(patient, completed_at, scope, outcome))
+
+    def flush(self, timeout=None):
+        """Block until everything recorded so far is on disk (or logged as dropped)."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---------------------
+    # Writer
+    # ---------------------
+
+    def _run(self):
+        batch = []
+        batch_started = None
+        while True:
+            timeout = None
+            if batch:
+                timeout = max(0.0, batch_started + self.flush_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ...
+
+            if isinstance(item, dict):
+                if not batch:
+                    batch_started = time.monotonic()
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+
+            if batch:
+                # A failed batch is logged and dropped; the writer must outlive
+                # it or record() would queue rows forever and flush() would hang.
+                try:
+                    self._write(batch)
+                except Exception:
+                    self.dropped_rows += len(batch)
+                    logger.exception("Dropped %d archive rows; writing to %s failed", len(batch), self.root)
+                batch = []
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
+
+    def _write(self, rows):
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row["completed_at"].date().isoformat(), []).append(row)
+
+        for day, day_rows in by_day.items():
+            directory = os.path.join(self.root, f"day={day}")
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pylist(day_rows, schema=SCHEMA)
+            pq.write_table(table, self._part_path(directory), compression="zstd")
+            self._compact(directory)
+
+    @staticmethod
+    def _part_path(directory):
+        return os.path.join(directory, f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}.parquet")
+
+    def _compact(self, directory):
+        """Merge a day's part files into one once there are `compact_files` of them."""
+        parts = [os.path.join(directory, name) for name in os.listdir(directory)
+                 if name.startswith("part-") and name.endswith(".parquet")]
+        if len(parts) < self.compact_files:
+            return
+        table = ds.dataset(parts, format="parquet", schema=SCHEMA).to_table()
+        # Dot-prefixed files are invisible to dataset discovery until renamed.
+        staging = os.path.join(directory, f".compact-{uuid.uuid4().hex[:8]}.parquet")
+        pq.write_table(table, staging, compression="zstd")
+        os.replace(staging, self._part_path(directory))
+        for path in parts:
+            os.remove(path)
+
+    # ---------------------
+    # Analytics
+    # ---------------------
+
+    def load(self, start_day=None, end_day=None, columns=None, include_evicted=False):
+        """Read archived rows as a DataFrame, pruning partitions by day (ISO strings)."""
+        if not os.path.isdir(self.root):
+            return SCHEMA.empty_table().to_pandas()
+
+        dataset = ds.dataset(
+            self.root,
+            format="parquet",
+            schema=SCHEMA.append(pa.field("day", pa.string())),
+            partitioning=ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive"),
+        )
+        condition = None
+        if not include_evicted:
+            # Files written before the outcome column read it as null.
+            condition = ds.field("outcome").is_null() | (ds.field("outcome") != "evicted")
+        if start_day:
+            lower = ds.field("day") >= start_day
+            condition = lower if condition is None else condition & lower
+        if end_day:
+            upper = ds.field("day") <= end_day
+            condition = upper if condition is None else condition & upper
+        try:
+            return dataset.to_table(columns=columns, filter=condition).to_pandas()
+        except FileNotFoundError:
+            # A compaction removed a file between discovery and reading.
+            return self.load(start_day, end_day, columns, include_evicted)
+
+    def rank_percentiles(self, start_day=None, end_day=None):
+        """Door-to-treatment and treatment-duration percentiles (minutes) per rank."""
+        df = self.load(start_day, end_day, columns=["rank", "door_to_treatment_min", "treatment_min"])
+        if df.empty:
+            return pd.DataFrame()
+
+        grouped = df.groupby("rank")
+        summary = grouped.size().rename("Completed").to_frame()
+        for column, label in [("door_to_treatment_min", "Door-to-treatment"), ("treatment_min", "Treatment")]:
+            quantiles = grouped[column].quantile(PERCENTILES).unstack()
+            quantiles.columns = [f"{label} p{int(p * 100)}" for p in quantiles.columns]
+            summary = summary.join(quantiles)
+        summary.index.name = "Rank"
+        return summary.round(1)
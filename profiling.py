@@ -0,0 +1,213 @@
+"""Opt-in profiling of Streamlit reruns.
+
+Enable with the `?profile=cprofile` / `?profile=sample` query parameter or
+the TRIAGE_PROFILE environment variable. When neither is set, `begin`
+returns None after one dict lookup and nothing else runs.
+
+- cprofile: deterministic cProfile of each rerun, merged into one pstats
+  table across reruns (exportable as a .prof file for snakeviz/flameprof).
+- sample:   a background thread samples the rerun thread's stack every few
+  milliseconds and counts collapsed stacks, exportable in the folded
+  "frame;frame;frame count" format used by flamegraph.pl and speedscope.
+
+Both modes aggregate across reruns and sessions in one process-wide
+`RerunProfiler`. A handle that is never ended (the rerun raised, or the tab
+closed mid-run) is closed and discarded once it is older than
+`stale_seconds`, so cProfile and sampler threads are not left running.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+MODES = ("cprofile", "sample")
+
+# Triage helpers worth watching on every rerun.
+HOT_FUNCTIONS = (
+    "calculate_wait_times",
+    "queue_wait_estimates",
+    "get_waiting_minutes",
+    "calculate_triage_rank",
+    "get_treatment_duration",
+    "predict",
+)
+
+
+def profiling_mode(query_params):
+    """Requested mode from the query string or environment, or None."""
+    mode = query_params.get("profile") or os.environ.get("TRIAGE_PROFILE")
+    return mode if mode in MODES else None
+
+
+class _Sampler:
+    """Samples one thread's Python stack on a timer."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rerun-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class RerunProfiler:
+    """Process-wide aggregate of profiled reruns."""
+
+    def __init__(self, sample_interval=0.005, stale_seconds=60.0):
+        self.sample_interval = sample_interval
+        self.stale_seconds = stale_seconds
+        self.reruns = 0
+        self.rerun_seconds = 0.0
+        self.abandoned = 0
+        self.stacks = Counter()
+        self._stats = None
+        self._open = set()     # handles begun but not yet ended
+        self._lock = threading.Lock()
+        # Only one cProfile can be active per process on newer Pythons.
+        self._cprofile_busy = threading.Lock()
+
+    # ---------------------
+    # Per-rerun hooks
+    # ---------------------
+
+    def begin(self, mode):
+        """Start profiling the calling thread; returns a handle for `end`, or None."""
+        if self._open:
+            self._reap_stale()
+        if mode is None:
+            return None
+        if mode == "cprofile":
+            if not self._cprofile_busy.acquire(blocking=False):
+                return None
+            profile = cProfile.Profile()
+            profile.enable()
+            handle = (mode, profile, time.perf_counter())
+        else:
+            handle = (mode, _Sampler(threading.get_ident(), self.sample_interval), time.perf_counter())
+        with self._lock:
+            self._open.add(handle)
+        return handle
+
+    def _close(self, handle):
+        """Stop a handle's collector; False if it was already closed."""
+        with self._lock:
+            if handle not in self._open:
+                return False
+            self._open.discard(handle)
+        mode, collector, _ = handle
+        if mode == "cprofile":
+            collector.disable()
+            self._cprofile_busy.release()
+        else:
+            collector.stop()
+        return True
+
+    def _reap_stale(self):
+        cutoff = time.perf_counter() - self.stale_seconds
+        with self._lock:
+            stale = [handle for handle in self._open if handle[2] < cutoff]
+        for handle in stale:
+            if self._close(handle):
+                self.abandoned += 1
+
+    def end(self, handle):
+        if handle is None or not self._close(handle):
+            return
+        mode, collector, started = handle
+        elapsed = time.perf_counter() - started
+        if mode == "cprofile":
+            try:
+                stats = pstats.Stats(collector)
+            except TypeError:   # nothing was recorded
+                stats = None
+        else:
+            stacks = collector.stacks
+
+        with self._lock:
+            self.reruns += 1
+            self.rerun_seconds += elapsed
+            if mode == "cprofile" and stats is not None:
+                if self._stats is None:
+                    self._stats = stats
+                else:
+                    self._stats.add(stats)
+            elif mode == "sample":
+                self.stacks.update(stacks)
+
+    # ---------------------
+    # Reports & export
+    # ---------------------
+
+    def hot_functions(self, names=HOT_FUNCTIONS, limit=15):
+        """Rows for the watched functions plus the top `limit` by own time."""
+        rows = []
+        with self._lock:
+            if self._stats is not None:
+                for (filename, line, func), (_, calls, tottime, cumtime, _) in self._stats.stats.items():
+                    rows.append({
+                        "function": f"{func} ({os.path.basename(filename)}:{line})",
+                        "watched": func in names,
+                        "calls": calls,
+                        "own_ms": round(tottime * 1000, 3),
+                        "cumulative_ms": round(cumtime * 1000, 3),
+                        "per_call_us": round(cumtime / calls * 1e6, 2) if calls else 0.0,
+                    })
+            else:
+                own = Counter()
+                total = Counter()
+                for stack, count in self.stacks.items():
+                    frames = stack.split(";")
+                    own[frames[-1]] += count
+                    for frame in set(frames):
+                        total[frame] += count
+                for frame, count in total.items():
+                    rows.append({
+                        "function": frame,
+                        "watched": frame.split(" ", 1)[0] in names,
+                        "own_samples": own[frame],
+                        "total_samples": count,
+                    })
+
+        key = "own_ms" if self._stats is not None else "own_samples"
+        rows.sort(key=lambda r: r[key], reverse=True)
+        return [r for r in rows if r["watched"]] + [r for r in rows if not r["watched"]][:limit]
+
+    def folded(self):
+        """Collapsed stacks for flamegraph.pl / speedscope (sample mode)."""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def pstats_bytes(self):
+        """Merged cProfile data as a .prof file (cprofile mode)."""
+        with self._lock:
+            if self._stats is None:
+                return b""
+            with tempfile.NamedTemporaryFile(suffix=".prof", delete=False) as f:
+                path = f.name
+            try:
+                self._stats.dump_stats(path)
+                with open(path, "rb") as f:
+                    return f.read()
+            finally:
+                os.unlink(path)
@@ -0,0 +1,261 @@
+"""Deterministic, headless replay of arrival/action traces.
+
+A trace is a JSONL file of timestamped actions:
+
+    {"t": 0.0,   "action": "arrive", "patient": "p1", "name": "...", "age": 70,
+     "critical": [], "other_symptoms": ["Dizziness"], "high_risk": [], "other_conditions": []}
+    {"t": 95.0,  "action": "start_treatment", "patient": "p1"}
+    {"t": 900.0, "action": "complete", "patient": "p1"}
+
+`t` is seconds since the start of the trace and `patient` is an opaque
+trace-local key. Replay feeds the actions through the same triage_core
+transitions app.py uses, on a simulated clock starting at a fixed instant,
+with IDs from a fresh IdAllocator, so two builds replaying the same trace do
+identical work. After each action it redoes the work a Streamlit rerun of
+the queue page would (sort, wait estimates, overdue flags) and times the
+whole step.
+
+Traces come from `generate` (seeded synthetic shifts) or from app.py with
+TRIAGE_TRACE=<path> set. app.py scopes each key by session, so traces from
+several sessions can share one file. Actions on the built-in sample patients
+carry keys no "arrive" defines and are skipped; a "start_treatment" without a
+key (older traces) starts the head of the queue.
+
+    python replay.py generate --seed 7 --arrivals 500 -o trace.jsonl
+    python replay.py run trace.jsonl --speed 0 -o replay_report.json
+"""
+import argparse
+import hashlib
+import json
+import random
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from duration_model import DurationModel
+from overdue_alerts import OverdueAlertEngine, patient_deadline
+from triage_core import (
+    IdAllocator, make_mock_patient, new_checkin_patient, enqueue_patient, sort_queue,
+    start_next_treatment, finish_patient, get_waiting_minutes, queue_wait_estimates
+)
+
+# Replays always start at the same wall-clock instant.
+REPLAY_EPOCH = datetime(2024, 1, 1, 8, 0, 0)
+
+
+# ---------------------
+# Recording
+# ---------------------
+
+class TraceRecorder:
+    """Append actions to a JSONL trace, timestamped from recorder creation."""
+
+    def __init__(self, path):
+        self.path = path
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, action, **fields):
+        event = {"t": round(time.monotonic() - self._started, 3), "action": action}
+        event.update(fields)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+def load_trace(path):
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return sorted(events, key=lambda e: e["t"])
+
+
+def generate_trace(seed, arrivals, mean_gap_seconds=120, beds=6):
+    """Synthetic shift: Poisson arrivals, `beds` parallel treatments, rank-based durations."""
+    rng = random.Random(seed)
+    events = []
+    t = 0.0
+    for n in range(arrivals):
+        t += rng.expovariate(1 / mean_gap_seconds)
+        p = make_mock_patient(idx=n, rng=rng, now=REPLAY_EPOCH)
+        events.append({
+            "t": round(t, 3), "action": "arrive", "patient": f"p{n}", "name": p["name"], "age": p["age"],
+            "critical": p["critical"], "other_symptoms": p["other_symptoms"],
+            "high_risk": p["high_risk"], "other_conditions": p["other_conditions"],
+        })
+
+    # Simulate the bed schedule so start/complete actions line up with a
+    # plausible queue.
+    state = SimpleNamespace(patients=[], queue_patients=[], treatment_patients=[], completed_count=0)
+    pending = sorted(events, key=lambda e: e["t"])
+    free_at = [0.0] * beds
+    actions = []
+    i = 0
+    while i < len(pending) or state.queue_patients:
+        next_bed = min(range(beds), key=free_at.__getitem__)
+        if i < len(pending) and (not state.queue_patients or pending[i]["t"] <= free_at[next_bed]):
+            e = pending[i]
+            i += 1
+            patient = new_checkin_patient(e["patient"], e["name"], e["age"], e["critical"], e["other_symptoms"],
+                                          e["high_risk"], e["other_conditions"],
+                                          now=REPLAY_EPOCH + timedelta(seconds=e["t"]))
+            enqueue_patient(state, patient)
+            sort_queue(state)
+            continue
+        start = max(free_at[next_bed], pending[i - 1]["t"] if i else 0.0)
+        treated = start_next_treatment(state, 0)
+        duration = 60 * max(3.0, rng.gauss(10 + 10 * (treated["rank"] <= 5), 4))
+        free_at[next_bed] = start + duration
+        actions.append({"t": round(start, 3), "action": "start_treatment", "patient": treated["id"]})
+        actions.append({"t": round(start + duration, 3), "action": "complete", "patient": treated["id"]})
+
+    return sorted(events + actions, key=lambda e: e["t"])
+
+
+# ---------------------
+# Replay
+# ---------------------
+
+def _summarize(values):
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean_us": round(statistics.fmean(ordered) * 1e6, 2),
+        "p50_us": round(ordered[len(ordered) // 2] * 1e6, 2),
+        "p95_us": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e6, 2),
+        "max_us": round(ordered[-1] * 1e6, 2),
+    }
+
+
+def rerun_queue_page(state, model, now):
+    """The per-rerun work of the queue management page, minus widgets.
+
+    Mirrors app.py row for row: the same wait-estimate helper, then per
+    waiting row the minutes waited and the overdue deadline, then per
+    treatment row the minutes in treatment and its deadline.
+    """
+    sort_queue(state)
+    rows = []
+    estimates = queue_wait_estimates(state.queue_patients, model.predict)
+    for patient, estimate in zip(state.queue_patients, estimates):
+        rows.append((get_waiting_minutes(patient["check_in"], now), estimate,
+                     now.timestamp() > patient_deadline(patient)[1]))
+    for patient in state.treatment_patients:
+        rows.append((get_waiting_minutes(patient["treatment_start"], now), patient["expected_duration"],
+                     now.timestamp() > patient_deadline(patient)[1]))
+    return rows, sum(1 for *_, overdue in rows if overdue)
+
+
+def replay(events, speed=0.0):
+    """Run the trace; `speed` is simulated seconds per real second (0 = unthrottled)."""
+    state = SimpleNamespace(patients=[], queue_patients=[], treatment_patients=[], completed_count=0)
+    next_id = IdAllocator()
+    model = DurationModel()
+    alerts = []
+    engine = OverdueAlertEngine(sink=alerts.append, now=REPLAY_EPOCH.timestamp())
+    ids = {}
+    latencies = {}
+    skipped = 0
+
+    wall_start = time.perf_counter()
+    for event in events:
+        now = REPLAY_EPOCH + timedelta(seconds=event["t"])
+        if speed:
+            delay = event["t"] / speed - (time.perf_counter() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+
+        action = event["action"]
+        started = time.perf_counter()
+        if action == "arrive":
+            patient = new_checkin_patient(next_id(), event["name"], event["age"], event["critical"],
+                                          event["other_symptoms"], event["high_risk"], event["other_conditions"],
+                                          now=now)
+            state.patients.append(patient)
+            ids[event["patient"]] = patient["id"]
+            enqueue_patient(state, patient)
+            engine.track(patient)
+        elif action == "start_treatment":
+            sort_queue(state)
+            if "patient" in event:
+                patient_id = ids.get(event["patient"])
+                head = next((p for p in state.queue_patients if p["id"] == patient_id), None)
+            else:
+                head = state.queue_patients[0] if state.queue_patients else None
+            if head is None:
+                skipped += 1
+                continue
+            treated = start_next_treatment(state, model.predict(head), now=now, next_patient=head)
+            engine.track(treated)
+        elif action == "complete":
+            patient_id = ids.get(event["patient"])
+            source = next((lst for lst in (state.treatment_patients, state.queue_patients)
+                           if any(p["id"] == patient_id for p in lst)), None)
+            if source is None:
+                skipped += 1
+                continue
+            patient = next(p for p in source if p["id"] == patient_id)
+            if patient.get("treatment_start"):
+                model.observe(patient, (now - datetime.fromisoformat(patient["treatment_start"])).total_seconds() / 60)
+            finish_patient(state, patient, source)
+            engine.cancel(patient_id)
+        else:
+            skipped += 1
+            continue
+        engine.poll(now.timestamp())
+        rerun_queue_page(state, model, now)
+        latencies.setdefault(action, []).append(time.perf_counter() - started)
+
+    final = {
+        "waiting": [p["id"] for p in state.queue_patients],
+        "in_treatment": [p["id"] for p in state.treatment_patients],
+        "completed": state.completed_count,
+        "alerts": len(alerts),
+    }
+    return {
+        "events": len(events),
+        "skipped": skipped,
+        "simulated_seconds": events[-1]["t"] if events else 0,
+        "wall_seconds": round(time.perf_counter() - wall_start, 4),
+        "latency": {action: _summarize(values) for action, values in sorted(latencies.items())},
+        "final_state": {k: (len(v) if isinstance(v, list) else v) for k, v in final.items()},
+        # Identical traces must give identical digests on every build.
+        "state_digest": hashlib.sha256(json.dumps(final, sort_keys=True).encode()).hexdigest(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="write a seeded synthetic trace")
+    gen.add_argument("--seed", type=int, default=0)
+    gen.add_argument("--arrivals", type=int, default=500)
+    gen.add_argument("--beds", type=int, default=6)
+    gen.add_argument("-o", "--output", default="trace.jsonl")
+
+    run = sub.add_parser("run", help="replay a trace and report per-action latency")
+    run.add_argument("trace")
+    run.add_argument("--speed", type=float, default=0.0, help="simulated seconds per real second; 0 = as fast as possible")
+    run.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        events = generate_trace(args.seed, args.arrivals, beds=args.beds)
+        with open(args.output, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        print(f"Wrote {len(events)} events to {args.output}")
+        return
+
+    report = replay(load_trace(args.trace), speed=args.speed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
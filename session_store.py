@@ -0,0 +1,201 @@
+"""Memory-bounded per-session data for long-running servers.
+
+Streamlit keeps `st.session_state` alive for as long as a browser tab stays
+connected, so a kiosk left open for days pins its patient lists forever.
+app.py therefore keeps only small UI flags in `st.session_state` and puts
+the heavy data (patients, queues, ID allocator) in a process-wide
+`SessionStore`. The store drops entries idle for longer than `idle_seconds`,
+handing each to `on_evict` first so the caller can archive its waiting and
+in-treatment patients and cancel their alerts. Sessions in use are never
+evicted just to make room: `max_sessions` is a soft limit that is logged
+when exceeded. An evicted session starts over with fresh data on its next
+rerun. `update_all` visits every stored session, e.g. to re-rank them all
+when the triage rules change.
+
+`python session_store.py` is a soak test: it drives thousands of simulated
+sessions through check-ins on a simulated clock and prints resident memory
+at checkpoints, exiting non-zero if RSS keeps growing once idle sessions
+are being evicted.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from triage_core import (
+    IdAllocator, make_mock_patient, new_checkin_patient, enqueue_patient, sort_queue,
+    start_next_treatment, finish_patient
+)
+from triage_rules import current_rules
+
+logger = logging.getLogger(__name__)
+
+class SessionStore:
+    """Idle-timeout map of session id -> session data, kept in last-seen order."""
+
+    def __init__(self, factory, max_sessions=200, idle_seconds=3600, on_evict=None, clock=time.monotonic):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.on_evict = on_evict
+        self.clock = clock
+        self.evictions = 0
+        self._over_capacity = False
+        self._entries = OrderedDict()   # session id -> [data, last_seen]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, session_id):
+        """Return (data, created) for the session, creating it if missing or evicted."""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            created = entry is None
+            if created:
+                entry = self._entries[session_id] = [self.factory(), now]
+            else:
+                entry[1] = now
+                self._entries.move_to_end(session_id)
+            evicted = self._evict(now, keep=session_id)
+            over_capacity = len(self._entries) > self.max_sessions
+            warn = over_capacity and not self._over_capacity
+            self._over_capacity = over_capacity
+
+        if warn:
+            logger.warning("%d active sessions exceed the soft limit of %d; none are idle enough to evict",
+                           len(self._entries), self.max_sessions)
+        for evicted_id, data in evicted:
+            if self.on_evict is not None:
+                self.on_evict(evicted_id, data)
+        return entry[0], created
+
+    def update_all(self, fn):
+        """Call `fn(session_id, data)` for every stored session while holding the store lock."""
+        with self._lock:
+            for session_id, (data, _) in self._entries.items():
+                fn(session_id, data)
+
+    def _evict(self, now, keep):
+        evicted = []
+        # Least recently seen entries sit at the front, so the scan stops at the first one in use.
+        while self._entries:
+            session_id, (data, last_seen) = next(iter(self._entries.items()))
+            if session_id == keep or now - last_seen < self.idle_seconds:
+                break
+            del self._entries[session_id]
+            evicted.append((session_id, data))
+        self.evictions += len(evicted)
+        return evicted
+
+
+def new_session_data(mock_patients, next_id_start=10000, rules=None):
+    """Per-session data around shallow copies of the shared mock patients.
+
+    A rules change re-ranks each session's patients in place, so every
+    session gets its own top-level dicts; the symptom lists inside are never
+    mutated and stay shared. `rules` is the RuleSet the mocks were ranked
+    with, so the session's first apply_rules catches up with any reload since.
+    """
+    return SimpleNamespace(
+        patients=[dict(p) for p in mock_patients],
+        queue_patients=[],
+        treatment_patients=[],
+        completed_count=0,
+        next_patient_id=IdAllocator(start=next_id_start),
+        rules=rules or current_rules(),
+    )
+
+
+def make_shared_mock_patients(rng=random, count=18, start_id=10000, rules=None):
+    """The dashboard's mock patients, built once per process and never mutated afterwards."""
+    rules = rules or current_rules()
+    patients = []
+    for i in range(count):
+        if i < 3:
+            force = "critical"
+        elif i < 7:
+            force = "vulnerable"
+        else:
+            force = None
+        patients.append(make_mock_patient(idx=start_id + i, force_priority=force, rng=rng, rules=rules))
+    return tuple(patients)
+
+
+# ---------------------
+# Soak test
+# ---------------------
+
+def current_rss_bytes():
+    """Resident set size right now (Linux /proc; falls back to peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def soak(sessions=5000, max_sessions=200, checkins=30, checkpoints=10, seed=0, idle_seconds=3600):
+    """Sessions arrive evenly so that about `max_sessions` are within `idle_seconds` at once."""
+    rng = random.Random(seed)
+    mocks = make_shared_mock_patients(rng)
+    clock = SimpleNamespace(now=0.0)
+    archived = []
+    store = SessionStore(lambda: new_session_data(mocks, next_id_start=10000 + len(mocks)),
+                         max_sessions=max_sessions, idle_seconds=idle_seconds, clock=lambda: clock.now,
+                         on_evict=lambda _, data: archived.append(len(data.queue_patients) + len(data.treatment_patients)))
+
+    rules = current_rules()
+    samples = []
+    every = max(1, sessions // checkpoints)
+    for n in range(sessions):
+        clock.now += idle_seconds / max_sessions
+        state, _ = store.get(f"session-{n}")
+        for i in range(checkins):
+            patient = new_checkin_patient(state.next_patient_id(), f"Soak {n}-{i}", rng.randint(1, 90),
+                                          [], rng.sample(rules.other_symptom_names, k=1), [], [])
+            state.patients.append(patient)
+            enqueue_patient(state, patient)
+            if rng.random() < 0.05:
+                state.patients.append(new_checkin_patient(state.next_patient_id(), "Critical", 50,
+                                                          rng.sample(rules.critical_symptom_names, k=1), [], [], []))
+        sort_queue(state)
+        for _ in range(checkins // 2):
+            finish_patient(state, start_next_treatment(state, 10), state.treatment_patients)
+        if (n + 1) % every == 0:
+            gc.collect()
+            samples.append({"sessions_seen": n + 1, "resident_sessions": len(store),
+                            "archived_live_patients": sum(archived),
+                            "rss_mb": round(current_rss_bytes() / 2**20, 2)})
+    return store, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--max-sessions", type=int, default=200)
+    parser.add_argument("--checkins", type=int, default=30, help="check-ins per simulated session")
+    parser.add_argument("--tolerance-mb", type=float, default=5.0,
+                        help="allowed RSS growth between the first full-store checkpoint and the end")
+    args = parser.parse_args()
+
+    store, samples = soak(args.sessions, args.max_sessions, args.checkins)
+    full = [s for s in samples if s["sessions_seen"] >= 2 * args.max_sessions] or samples
+    growth = full[-1]["rss_mb"] - full[0]["rss_mb"]
+    print(json.dumps({"evictions": store.evictions, "rss_growth_mb": round(growth, 2), "samples": samples}, indent=2))
+    if growth > args.tolerance_mb:
+        sys.exit(f"RSS grew {growth:.2f} MB after the store filled (tolerance {args.tolerance_mb} MB)")
+
+
+if __name__ == "__main__":
+    main()
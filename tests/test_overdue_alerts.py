@@ -0,0 +1,63 @@
+import time
+from datetime import datetime, timedelta
+
+from overdue_alerts import OverdueAlertEngine
+
+EPOCH = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def treatment_patient(patient_id, minutes):
+    return {"id": patient_id, "name": f"P{patient_id}", "rank": 5,
+            "treatment_start": EPOCH.isoformat(), "expected_duration": minutes}
+
+
+def test_failed_sink_write_does_not_drop_other_alerts():
+    delivered = []
+
+    def flaky_sink(event):
+        if not delivered and event["patient_id"] == 1:
+            delivered.append(None)      # fail only the first delivery
+            raise OSError("disk full")
+        delivered.append(event["patient_id"])
+
+    engine = OverdueAlertEngine(sink=flaky_sink, now=EPOCH.timestamp())
+    for patient_id in (1, 2, 3):
+        engine.track(treatment_patient(patient_id, 10))
+
+    fired = engine.poll((EPOCH + timedelta(minutes=11)).timestamp())
+
+    assert fired == 3
+    assert engine.failed == 1
+    assert delivered[1:] == [2, 3]
+
+
+def test_background_thread_survives_sink_errors():
+    delivered = []
+    calls = []
+
+    def flaky_sink(event):
+        calls.append(event["patient_id"])
+        if len(calls) == 1:
+            raise OSError("disk full")
+        delivered.append(event["patient_id"])
+
+    now = time.time()
+    engine = OverdueAlertEngine(sink=flaky_sink, tick_seconds=0.05)
+    first = {"id": 1, "rank": 5, "treatment_start": datetime.fromtimestamp(now).isoformat(),
+             "expected_duration": 0.001}
+    engine.track(first)
+    engine.start()
+    try:
+        deadline = time.time() + 2
+        while not calls and time.time() < deadline:
+            time.sleep(0.02)
+        second = dict(first, id=2, treatment_start=datetime.now().isoformat())
+        engine.track(second)
+        while not delivered and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        engine.stop()
+
+    assert calls[0] == 1
+    assert delivered == [2]
+    assert engine.failed == 1
@@ -0,0 +1,255 @@
+"""Triage scoring, mock data and queue state transitions.
+
+Nothing in here touches Streamlit: app.py calls these functions with its
+per-session data from the session store, while headless tools (replay,
+benchmarks) pass any object with the same attributes. Every function that
+reads the clock or randomness accepts `now`/`rng` so runs can be reproduced.
+"""
+import itertools
+import random
+from datetime import datetime, timedelta
+
+from duration_model import primary_symptom
+from triage_rules import current_rules, rerank_patients, changed_wait_ranks
+
+# ---------------------
+# Triage scoring & Mock Data
+# ---------------------
+
+FIRST_NAMES = ["Alex","Sam","Jordan","Taylor","Riley","Morgan","Casey","Jamie","Avery","Cameron",
+               "Lee","Robin","Neil","Ike","Noah","Maya","Zara","Lina","Ola","Ethan"]
+LAST_NAMES = ["Adams","Bell","Clark","Davis","Evans","Ford","Green","Hall","Irwin","James",
+              "Khan","Lopez","Miller","Nguyen","Osei","Patel","Quinn","Reed","Smith","Young"]
+
+# Rank tables are loaded from triage_rules.json; see triage_rules.py
+
+def calculate_triage_rank(patient, rules=None):
+    """Calculates the triage rank based on the new logic."""
+    rules = rules or current_rules()
+    ranks = []
+
+    # Check critical symptoms
+    for symptom in patient.get("critical", []):
+        if symptom in rules.critical_symptoms:
+            ranks.append(rules.critical_symptoms[symptom])
+
+    # Check other symptoms
+    for symptom in patient.get("other_symptoms", []):
+        if symptom in rules.other_symptoms:
+            ranks.append(rules.other_symptoms[symptom])
+
+    # Check other conditions
+    for condition in patient.get("other_conditions", []):
+        if condition in rules.other_conditions:
+            ranks.append(rules.other_conditions[condition])
+
+    # The 'high_risk' key from the form now maps to vulnerable conditions
+    is_vulnerable_by_condition = any(c in rules.vulnerable_conditions for c in patient.get("high_risk", []))
+
+    if not ranks:
+        base_rank = 10  # Default for no selections
+    else:
+        base_rank = min(ranks)
+
+    # Determine if patient is in a vulnerable group
+    age = patient.get("age", 30)
+    is_vulnerable = (age <= 5) or (age >= 65) or is_vulnerable_by_condition
+
+    # Apply priority upgrade for vulnerable groups
+    if is_vulnerable:
+        # If it's a critical symptom (rank 1-2), it's flagged as highest emergency
+        if base_rank <= 2:
+            return 1
+        # For other symptoms, reduce rank by 1 (upgrade priority)
+        else:
+            return max(1, base_rank - 1)
+
+    return base_rank
+
+def random_name(rng=random):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+def assign_priority_from_rank(patient, rules=None):
+    """Assigns priority level and color based on the calculated triage rank."""
+    rank = calculate_triage_rank(patient, rules)
+    patient['rank'] = rank  # Store the rank in the patient dict
+
+    if rank <= 2:
+        priority_label = "🚨 Life-threatening (Critical)"
+        color = "red"
+    elif rank <= 5:
+        priority_label = "🟠 Vulnerable (High Priority)"
+        color = "orange"
+    else:
+        priority_label = "🟢 Standard Care"
+        color = "green"
+
+    return priority_label, color
+
+def make_mock_patient(idx=None, force_priority=None, rng=random, now=None, rules=None):
+    """Create one mock patient dict; pass a seeded `rng` and fixed `now` for reproducible data"""
+    now = now or datetime.now()
+    rules = rules or current_rules()
+    age = rng.choice([rng.randint(1,4), rng.randint(5,15), rng.randint(16,40),
+                      rng.randint(41,64), rng.randint(65,90)])
+    critical = []
+    high_risk = []
+    other_symptoms = []
+
+    if force_priority == "critical" or rng.random() < 0.12:
+        critical = rng.sample(rules.critical_symptom_names, k=1)
+    if force_priority == "vulnerable" or rng.random() < 0.2:
+        high_risk = rng.sample(rules.vulnerable_condition_names, k=1)
+    other_symptoms = rng.sample(rules.other_symptom_names, k=rng.randint(0,2))
+
+    patient = {
+        "id": idx if idx is not None else rng.randint(1000,9999),
+        "name": random_name(rng),
+        "age": age,
+        "critical": critical,
+        "other_symptoms": other_symptoms,
+        "high_risk": high_risk,
+        "other_conditions": rng.sample(rules.other_condition_names, k=rng.randint(0,1)),
+        "check_in": (now - timedelta(minutes=rng.randint(0,120))).isoformat(),
+        "status": rng.choices(["waiting","in_treatment"], weights=[0.6,0.4])[0]
+    }
+    patient["priority"], patient["color"] = assign_priority_from_rank(patient, rules)
+    return patient
+
+
+def get_waiting_minutes(check_in_time, now=None):
+    """Calculate minutes since check-in"""
+    check_in = datetime.fromisoformat(check_in_time)
+    now = now or datetime.now()
+    return int((now - check_in).total_seconds() / 60)
+
+def priority_sort_key(patient):
+    """Queue order: triage rank, then check-in time"""
+    return (patient.get('rank', 10), patient["check_in"])
+
+class IdAllocator:
+    """Monotonic, collision-free patient IDs"""
+
+    def __init__(self, start=10000):
+        self._counter = itertools.count(start)
+
+    def __call__(self):
+        return next(self._counter)
+
+# ---------------------
+# Queue state transitions
+# ---------------------
+
+def validate_checkin(name, age, critical, other_symptoms, high_risk, other_conditions):
+    """Return the check-in form's error messages; empty when the submission is valid"""
+    errors = []
+
+    if not name.strip():
+        errors.append("Please enter a name.")
+
+    if age <= 0:
+        errors.append("Please enter a valid age.")
+
+    # Check if all categories are set to "None" or empty
+    all_none_or_empty = all(
+        not selected or selected == ["None"]
+        for selected in (critical, other_symptoms, high_risk, other_conditions)
+    )
+
+    if all_none_or_empty:
+        errors.append("Please select at least one medical symptom or condition from any category to proceed.")
+
+    return errors
+
+def new_checkin_patient(patient_id, name, age, critical, other_symptoms, high_risk, other_conditions, now=None,
+                        rules=None):
+    """Build and score the patient record created by the check-in form"""
+    patient = {
+        "id": patient_id,
+        "name": name,
+        "age": age,
+        "critical": critical,
+        "other_symptoms": other_symptoms,
+        "high_risk": high_risk,
+        "other_conditions": other_conditions,
+        "check_in": (now or datetime.now()).isoformat(),
+        "status": "waiting"
+    }
+    patient["priority"], patient["color"] = assign_priority_from_rank(patient, rules)
+    return patient
+
+def enqueue_patient(state, patient):
+    """Add a checked-in patient to the waiting queue unless already there"""
+    if any(p["id"] == patient["id"] for p in state.queue_patients):
+        return None
+    queue_patient = {
+        "id": patient["id"],
+        "name": patient["name"],
+        "priority": patient["priority"],
+        "check_in": patient["check_in"],
+        "age": patient["age"],
+        "rank": patient.get("rank"),
+        "symptom": primary_symptom(patient),
+        # Rank inputs, so a rules change can re-score the queue in place
+        "critical": patient.get("critical", []),
+        "other_symptoms": patient.get("other_symptoms", []),
+        "high_risk": patient.get("high_risk", []),
+        "other_conditions": patient.get("other_conditions", [])
+    }
+    state.queue_patients.append(queue_patient)
+    return queue_patient
+
+def sort_queue(state):
+    state.queue_patients.sort(key=priority_sort_key)
+
+def queue_wait_estimates(queue_patients, predict):
+    """Estimated minutes until treatment for each position of a sorted queue"""
+    # One running sum: each position waits for the treatments of everyone ahead
+    estimates = []
+    wait_ahead = 0
+    for patient in queue_patients:
+        estimates.append(wait_ahead)
+        wait_ahead += predict(patient)
+    return estimates
+
+def start_next_treatment(state, expected_duration, now=None, next_patient=None):
+    """Move `next_patient` (default: the head of the sorted queue) into treatment"""
+    next_patient = next_patient or state.queue_patients[0]
+    treatment_patient = {
+        "id": next_patient["id"],
+        "name": next_patient["name"],
+        "priority": next_patient["priority"],
+        "rank": next_patient.get("rank"),
+        "check_in": next_patient["check_in"],
+        "symptom": next_patient.get("symptom"),
+        "treatment_start": (now or datetime.now()).isoformat(),
+        "expected_duration": expected_duration,
+        "age": next_patient["age"],
+        "is_sample": next_patient.get("is_sample", False)
+    }
+    state.treatment_patients.append(treatment_patient)
+    state.queue_patients.remove(next_patient)
+    return treatment_patient
+
+def apply_rules(state, rules):
+    """Bring a session up to `rules`; returns the queue patients whose wait deadline moved"""
+    if state.rules is rules:
+        return []
+    rerank_patients(state.patients, state.rules, rules, assign_priority_from_rank)
+    moved = rerank_patients(state.queue_patients, state.rules, rules, assign_priority_from_rank)
+    if moved:
+        # A new list rather than an in-place sort: the rule watcher calls this
+        # while the session's rerun may be rendering the old one
+        state.queue_patients = sorted(state.queue_patients, key=priority_sort_key)
+    # A new rank or a new target for the same rank both move the deadline
+    wait_ranks = changed_wait_ranks(state.rules, rules)
+    moved_ids = {p["id"] for p in moved}
+    retimed = [p for p in state.queue_patients
+               if p["id"] in moved_ids or p.get("rank", 10) in wait_ranks]
+    state.rules = rules
+    return retimed
+
+def finish_patient(state, patient, source_list):
+    """Drop a completed patient from the queue or treatment list"""
+    source_list.remove(patient)
+    state.completed_count += 1
@@ -0,0 +1,303 @@
+"""Versioned triage rule tables with hot reload.
+
+The symptom/condition ranks and wait-time targets live in triage_rules.json
+(path overridable with TRIAGE_RULES). A file is compiled once into an
+immutable `RuleSet` of read-only mappings, frozensets and option tuples.
+`current_rules()` returns the active set; swapping in a new one is a single
+reference assignment, so a rerun that grabbed the old set keeps a consistent
+view while the next rerun sees the new one.
+
+`RuleWatcher` polls the file and swaps on change; a file that fails to
+parse or validate is logged and the previous rules stay active.
+`rerank_patients` moves a live queue to new rules in bulk, re-scoring only
+patients whose inputs touch an entry that changed; `changed_wait_ranks`
+tells callers which waiting patients' alert deadlines moved.
+
+`python triage_rules.py` benchmarks compile, swap and re-rank latency with
+10,000 queued patients.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+RULES_PATH = os.environ.get("TRIAGE_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "triage_rules.json"))
+RANKS = range(1, 11)
+
+RuleSet = namedtuple("RuleSet", [
+    "version",
+    "critical_symptoms",            # name -> rank
+    "vulnerable_conditions",        # frozenset of names
+    "other_symptoms",               # name -> rank
+    "other_conditions",             # name -> rank
+    "wait_time_targets",            # rank -> label
+    "wait_time_minutes",            # rank -> minutes
+    "critical_symptom_names",       # form option tuples
+    "vulnerable_condition_names",
+    "other_symptom_names",
+    "other_condition_names",
+])
+
+
+# ---------------------
+# Loading & compiling
+# ---------------------
+
+def _rank_table(data, key):
+    table = data.get(key)
+    if not isinstance(table, dict):
+        raise ValueError(f"{key} must be an object of name -> rank")
+    for name, rank in table.items():
+        if not isinstance(rank, int) or rank not in RANKS:
+            raise ValueError(f"{key}[{name!r}] must be a rank between 1 and 10, got {rank!r}")
+    return MappingProxyType(dict(table))
+
+
+def compile_rules(data, source=b""):
+    """Validate parsed rule data and build an immutable RuleSet."""
+    if not isinstance(data.get("version"), str) or not data["version"]:
+        raise ValueError("version must be a non-empty string")
+    vulnerable = data.get("vulnerable_conditions")
+    if not isinstance(vulnerable, list) or not all(isinstance(v, str) for v in vulnerable):
+        raise ValueError("vulnerable_conditions must be a list of names")
+
+    targets = data.get("wait_time_targets", {})
+    labels, minutes = {}, {}
+    for rank in RANKS:
+        target = targets.get(str(rank))
+        if not isinstance(target, dict) or not isinstance(target.get("minutes"), (int, float)):
+            raise ValueError(f"wait_time_targets[{rank}] needs a label and minutes")
+        labels[rank] = str(target.get("label", ""))
+        minutes[rank] = target["minutes"]
+
+    critical = _rank_table(data, "critical_symptoms")
+    other_symptoms = _rank_table(data, "other_symptoms")
+    other_conditions = _rank_table(data, "other_conditions")
+
+    # The content hash tells two edits with the same version string apart.
+    digest = hashlib.sha256(source).hexdigest()[:8] if source else "inline"
+    return RuleSet(
+        version=f"{data['version']}+{digest}",
+        critical_symptoms=critical,
+        vulnerable_conditions=frozenset(vulnerable),
+        other_symptoms=other_symptoms,
+        other_conditions=other_conditions,
+        wait_time_targets=MappingProxyType(labels),
+        wait_time_minutes=MappingProxyType(minutes),
+        critical_symptom_names=tuple(critical),
+        vulnerable_condition_names=tuple(vulnerable),
+        other_symptom_names=tuple(other_symptoms),
+        other_condition_names=tuple(other_conditions),
+    )
+
+
+def load_rules(path=RULES_PATH):
+    with open(path, "rb") as f:
+        source = f.read()
+    return compile_rules(json.loads(source.decode("utf-8")), source)
+
+
+_current = load_rules()
+
+
+def current_rules():
+    """The active RuleSet; read it once per rerun/operation and reuse it."""
+    return _current
+
+
+def swap_rules(rules):
+    """Atomically make `rules` the active set; returns the previous one."""
+    global _current
+    previous, _current = _current, rules
+    return previous
+
+
+# ---------------------
+# Watching
+# ---------------------
+
+class RuleWatcher:
+    """Polls a rules file and swaps in each valid new version."""
+
+    def __init__(self, path=RULES_PATH, interval=2.0, on_swap=None):
+        self.path = path
+        self.interval = interval
+        self.on_swap = on_swap
+        self.errors = 0
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def check(self):
+        """Reload if the file changed; returns the new RuleSet or None."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        self._signature = signature
+        try:
+            rules = load_rules(self.path)
+        except (OSError, ValueError) as exc:   # JSONDecodeError is a ValueError
+            self.errors += 1
+            logger.error("Keeping triage rules %s; %s is invalid: %s", current_rules().version, self.path, exc)
+            return None
+        if rules.version == current_rules().version:
+            return None
+        previous = swap_rules(rules)
+        logger.info("Triage rules %s -> %s", previous.version, rules.version)
+        if self.on_swap is not None:
+            self.on_swap(previous, rules)
+        return rules
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rule-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Applying triage rules from %s failed", self.path)
+
+
+# ---------------------
+# Re-ranking
+# ---------------------
+
+def changed_entries(old, new):
+    """Names whose contribution to a rank differs between two rule sets, per patient field."""
+    def diff(a, b):
+        return frozenset(k for k in a.keys() | b.keys() if a.get(k) != b.get(k))
+    return {
+        "critical": diff(old.critical_symptoms, new.critical_symptoms),
+        "other_symptoms": diff(old.other_symptoms, new.other_symptoms),
+        "other_conditions": diff(old.other_conditions, new.other_conditions),
+        "high_risk": old.vulnerable_conditions ^ new.vulnerable_conditions,
+    }
+
+
+def changed_wait_ranks(old, new):
+    """Ranks whose wait-time target (minutes) differs between two rule sets."""
+    return frozenset(rank for rank in RANKS if old.wait_time_minutes[rank] != new.wait_time_minutes[rank])
+
+
+def rerank_patients(patients, old, new, score):
+    """Re-score the patients affected by old -> new in place; returns those whose rank changed.
+
+    `score(patient, rules)` is triage_core.assign_priority_from_rank. Patients
+    without rank inputs (e.g. the built-in samples) keep their rank. Callers
+    re-sort once afterwards if anything changed.
+    """
+    changed = changed_entries(old, new)
+    fields = [(field, names) for field, names in changed.items() if names]
+    if not fields:
+        return []
+
+    moved = []
+    for patient in patients:
+        # isdisjoint walks the patient's list without building a set; most
+        # patients match nothing, so this scan is the bulk of the work
+        for field, names in fields:
+            if not names.isdisjoint(patient.get(field, ())):
+                break
+        else:
+            continue
+        before = patient.get("rank")
+        patient["priority"], patient["color"] = score(patient, new)
+        if patient["rank"] != before:
+            moved.append(patient)
+    return moved
+
+
+# ---------------------
+# Benchmark
+# ---------------------
+
+def benchmark(queued=10000, seed=0, repeat=5):
+    """Best-of-`repeat` timings; each round swaps to the edited rules and back."""
+    from triage_core import assign_priority_from_rank, make_mock_patient, priority_sort_key
+
+    rng = random.Random(seed)
+    base = current_rules()
+    queue = [make_mock_patient(idx=i, rng=rng) for i in range(queued)]
+    queue.sort(key=priority_sort_key)
+
+    with open(RULES_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    # A typical protocol change: re-grade two entries.
+    data["version"] = base.version.split("+")[0] + "-bench"
+    data["other_symptoms"]["Dizziness"] = 2
+    data["other_conditions"]["Migraine"] = 5
+    source = json.dumps(data).encode()
+
+    started = time.perf_counter()
+    new = compile_rules(json.loads(source), source)
+    compiled = time.perf_counter()
+    previous = swap_rules(new)
+    swapped = time.perf_counter()
+    swap_rules(previous)
+
+    def incremental(old, rules):
+        moved = rerank_patients(queue, old, rules, assign_priority_from_rank)
+        if moved:
+            queue.sort(key=priority_sort_key)
+        return moved
+
+    def full(old, rules):
+        # Baseline: re-score and re-sort everyone.
+        for patient in queue:
+            assign_priority_from_rank(patient, rules)
+        queue.sort(key=priority_sort_key)
+
+    timings = {incremental: [], full: []}
+    for _ in range(repeat):
+        for rerank in (incremental, full):
+            for old, rules in ((base, new), (new, base)):
+                t0 = time.perf_counter()
+                result = rerank(old, rules)
+                timings[rerank].append(time.perf_counter() - t0)
+                if rerank is incremental and rules is new:
+                    moved = result
+
+    return {
+        "queued": queued,
+        "compile_ms": round((compiled - started) * 1000, 3),
+        "swap_us": round((swapped - compiled) * 1e6, 3),
+        "incremental_rerank_ms": round(min(timings[incremental]) * 1000, 3),
+        "patients_rescored_rank_changed": len(moved),
+        "full_rerank_ms": round(min(timings[full]) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queued", type=int, default=10000)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.queued), indent=2))
+
+
+if __name__ == "__main__":
+    main()